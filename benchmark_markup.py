@@ -0,0 +1,66 @@
+"""
+Microbenchmarks of the markup dialects, i. e. the conversion of a single page.
+Run by "uv run python benchmark_markup.py".
+"""
+
+from pathlib import Path
+import timeit
+
+import jimmy.md_lib.colornote
+import jimmy.md_lib.roam_research
+import jimmy.md_lib.tiddlywiki
+import jimmy.md_lib.zettelkasten
+import jimmy.md_lib.zim
+
+# Representative pages of each markup dialect. Plain text dominates real notes.
+PLAIN_TEXT = "Some plain text without any markup, like most of the lines in a note.\n" * 5
+ZIM_PAGE = (
+    "====== Heading ======\n"
+    + PLAIN_TEXT
+    + "''monospace'' **bold** //italic// __highlighted__ super^{script} sub_{script}\n"
+    + "[ ] unchecked\n    [*] done\n[x] not done\n"
+    + "[[https://www.bvb.de/|TITLE ''monospace'']] [[+SubPage]] [[./file.pdf]]\n"
+    + "{{./image.png?width=600}}\n"
+    + "'''\nsome code\nblock\n'''\n"
+)
+WIKITEXT_PAGE = (
+    "! Heading\n"
+    + PLAIN_TEXT
+    + "''bold'' __underline__ //italic// ^^super^^ ,,sub,, @@highlight@@ -- --- \n"
+    + "* First item\n** Subitem\n# Step 1\n"
+    + "[[Tiddler Title]] [[TW5|https://tiddlywiki.com/]] [img[Motovun Jack.jpg]]\n"
+    + "<<<\nComputers are like a bicycle for our minds\n<<< S. Jobs\n"
+    + "|!Cell1 |!Cell2 |\n|Cell3 |Cell4 |\n"
+)
+ROAM_PAGE = (
+    PLAIN_TEXT
+    + "^^highlighted^^ __italic__ #tag #[[another tag]]\n"
+    + "- {{[[TODO]]}} check\n- {{[[DONE]]}} list\n"
+    + "[[link to page]] [link to block](((JF3iFJPKu))) {{[[embed]]: ((sHQRa0Wan))}}\n"
+)
+BBCODE_PAGE = (
+    "[h1]Heading[/h1][br]"
+    + PLAIN_TEXT.replace("\n", "[br]")
+    + "[f]bold[/f] [k]italic[/k] [d]strike[/d] [h #ffff00]colored[/h][br]"
+    + "[l][*]Here an item[/*][*]Other [d]item[/d]![/*][/l]"
+    + "link [z 3]zu Zettel 3[/z] [img]some image.png[/img][br]"
+    + "[table][tc]Test Table[/tc][br]h 1^h 2^h3[br]d1 |d 2 |d3[/table]"
+    + "[code]long[br]code block[/code]"
+)
+COLORNOTE_PAGE = PLAIN_TEXT + "[V] A\n[V] B\n[ ] Item 1\n[ ] Item 2\n"
+
+
+DIALECTS = {
+    "zim": lambda: jimmy.md_lib.zim.zim_to_md(ZIM_PAGE, Path("page")),
+    "tiddlywiki": lambda: jimmy.md_lib.tiddlywiki.wikitext_to_md(WIKITEXT_PAGE),
+    "roam_research": lambda: jimmy.md_lib.roam_research.roam_to_md(ROAM_PAGE),
+    "zettelkasten": lambda: jimmy.md_lib.zettelkasten.bbcode_to_md(BBCODE_PAGE),
+    "colornote": lambda: jimmy.md_lib.colornote.colornote_to_md(COLORNOTE_PAGE),
+}
+
+
+if __name__ == "__main__":
+    NUMBER = 10
+    for dialect, convert in DIALECTS.items():
+        best = min(timeit.repeat(convert, number=NUMBER, repeat=3))
+        print(f"{dialect}: {best / NUMBER * 1000:.3f} ms per page")
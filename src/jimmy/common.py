@@ -1,23 +1,35 @@
 """Common functions for converting notes, related to the filesystem and metadata."""
 
-import base64
-from collections.abc import Callable
+import abc
+import atexit
+from collections.abc import Callable, Iterable, Iterator
+import concurrent.futures
 import dataclasses
 import datetime as dt
 import difflib
-import gzip
+import fnmatch
+import functools
 import hashlib
+import heapq
+import io
+import json
 import logging
+import logging.handlers
+import multiprocessing
+import os
 from pathlib import Path
 import random
 import re
+import shutil
+import stat
 import string
 import tarfile
 import tempfile
 import time
-from typing import Any, TypeVar, cast
+from typing import Any, BinaryIO, TextIO, TypeVar, cast
 from urllib.parse import unquote
 import uuid
+import xml.etree.ElementTree as ET  # noqa: N817
 import zipfile
 
 import puremagic
@@ -45,6 +57,11 @@ class Config:
     local_image_folder: Path | None = None
     max_name_length: int = 50
     print_tree: bool = False
+    jobs: int = 1
+    max_pdf_pages: int | None = None
+    # temporary files
+    scratch_dir: Path | None = None
+    max_scratch_size: int | None = None  # MiB
     # filter
     exclude_notes: list[str] | None = None
     exclude_notes_with_tags: list[str] | None = None
@@ -67,21 +84,100 @@ def catch_all_exceptions(func: F) -> F:
     """
     Decorator to catch all exceptions.
     Useful if many individual notes are converted.
+    Returns None if an exception was caught.
     """
 
+    # "wraps" keeps decorated functions picklable for process pools.
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
         try:
-            func(*args, **kwargs)
+            return func(*args, **kwargs)
+        except ScratchSpaceExceededError:
+            raise  # Abort early. All following notes would fail, too.
         except Exception as exc:  # pylint: disable=broad-except
             LOGGER.warning(
                 'Failed to convert note. Enable the extended log by "--stdout-log-level DEBUG".'
             )
             # https://stackoverflow.com/a/52466005/7410886
             LOGGER.debug(exc, exc_info=True)
+            return None
 
     return cast(F, wrapper)
 
 
+def map_parallel(
+    function: Callable[..., Any],
+    *iterables: Iterable,
+    jobs: int = 1,
+    processes: bool = False,
+) -> Iterator:
+    """
+    Like the builtin map(), but optionally in parallel. The results are yielded
+    in the order of the items. If more than one job is requested, the items are
+    processed in a thread pool. CPU bound functions should use a process pool
+    instead. In this case, the function and the items need to be picklable.
+
+    >>> list(map_parallel(str.upper, ["a", "b"]))
+    ['A', 'B']
+    >>> list(map_parallel(abs, range(-3, 0), jobs=2))
+    [3, 2, 1]
+    >>> list(map_parallel(pow, [2, 3], [3, 2], jobs=2))
+    [8, 9]
+    """
+    if jobs <= 1:
+        yield from map(function, *iterables, strict=True)
+        return
+    if not processes:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+            yield from executor.map(function, *iterables)
+        return
+
+    # Worker processes don't inherit the logging setup and the scratch space.
+    # Forward their log records to the handlers of the main process.
+    log_queue: multiprocessing.Queue = multiprocessing.Queue()
+    log_listener = logging.handlers.QueueListener(
+        log_queue, *LOGGER.handlers, respect_handler_level=True
+    )
+    log_listener.start()
+    try:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=init_worker_process,
+            initargs=(log_queue, SCRATCH_SPACE.get_state()),
+        ) as executor:
+            yield from executor.map(function, *iterables)
+    finally:
+        log_listener.stop()
+
+
+def init_worker_process(log_queue: multiprocessing.Queue, scratch_space_state: tuple):
+    LOGGER.handlers = [logging.handlers.QueueHandler(log_queue)]
+    LOGGER.setLevel(logging.DEBUG)  # The handlers of the main process filter.
+    SCRATCH_SPACE.attach(*scratch_space_state)
+    LOGGER.propagate = False
+
+
+def distribute[T](items: list[T], weights: list[int], parts: int) -> list[list[T]]:
+    """
+    Distribute the items to parts of similar total weight. Empty parts are omitted.
+
+    >>> distribute(["a", "b", "c", "d"], [5, 1, 3, 3], 2)
+    [['a', 'b'], ['c', 'd']]
+    >>> distribute(["a", "b"], [1, 1], 3)
+    [['a'], ['b']]
+    >>> distribute([], [], 2)
+    []
+    """
+    buckets: list[list[T]] = [[] for _ in range(max(1, parts))]
+    # total weight and index of each bucket, the lightest bucket first
+    bucket_heap = [(0, index) for index in range(len(buckets))]
+    for weight, item in sorted(zip(weights, items, strict=True), key=lambda x: -x[0]):
+        total_weight, index = bucket_heap[0]
+        buckets[index].append(item)
+        heapq.heapreplace(bucket_heap, (total_weight + weight, index))
+    return [bucket for bucket in buckets if bucket]
+
+
 def safe_path(path: Path | str, max_name_length: int = 50) -> Path | str:
     r"""
     Return a safe version of the provided path or string.
@@ -168,7 +264,9 @@ def safe_path(path: Path | str, max_name_length: int = 50) -> Path | str:
     return safe_name if isinstance(path, str) else path.with_name(safe_name)
 
 
-def get_unique_path(path: Path, new_content: str | bytes | Path | None = None) -> Path:
+def get_unique_path(
+    path: Path, new_content: str | bytes | Path | ResourceContent | None = None
+) -> Path:
     """Get a unique path for a file."""
     if (  # pylint: disable=too-many-boolean-expressions
         # filename is "free"
@@ -178,6 +276,9 @@ def get_unique_path(path: Path, new_content: str | bytes | Path | None = None) -
         and new_content == path.read_bytes()
         or isinstance(new_content, Path)
         and new_content.read_bytes() == path.read_bytes()
+        or isinstance(new_content, ResourceContent)
+        and new_content.size == path.stat().st_size
+        and new_content.md5 == md5_hash(path)
         # text content is identical
         or isinstance(new_content, str)
         and new_content == path.read_text()
@@ -219,15 +320,25 @@ def try_other_suffixes(original_path: Path) -> Path | None:
     return None
 
 
-def write_base64(path: Path, base64_str: str) -> Path:
-    """Write a base64 encoded string to a file."""
-    content = base64.b64decode(base64_str)
-    path = get_unique_path(path, content)
-    path.write_bytes(content)
-    return path
-
-
-def guess_suffix(file_: Path) -> str:
+def magic_from_file(
+    file_: Path, mime: bool = False, content: bytes | ResourceContent | None = None
+) -> str:
+    """
+    Guess the file type by its content. Files inside archives are supported.
+    If the content is given, the file doesn't need to exist.
+    """
+    if isinstance(content, ResourceContent):
+        with content.open() as stream:
+            return puremagic.from_stream(stream, mime=mime, filename=file_.name)
+    if content is not None:
+        return puremagic.from_string(content, mime=mime, filename=file_.name)
+    if isinstance(file_, ArchivePath) and file_.member is not None:
+        with file_.open("rb") as stream:
+            return puremagic.from_stream(stream, mime=mime, filename=file_.name)
+    return puremagic.from_file(file_, mime=mime)
+
+
+def guess_suffix(file_: Path, content: bytes | ResourceContent | None = None) -> str:
     """
     >>> guess_suffix(Path(__file__))
     '.py'
@@ -235,9 +346,11 @@ def guess_suffix(file_: Path) -> str:
     ''
     >>> guess_suffix(Path("non/existing.txt"))
     ''
+    >>> guess_suffix(Path("non/existing"), b"%PDF-1.7")
+    '.pdf'
     """
     try:
-        guessed_suffix = puremagic.from_file(file_)
+        guessed_suffix = magic_from_file(file_, content=content)
         # regular jpg files seem to be guessed as jfif sometimes
         if guessed_suffix == ".jfif":
             guessed_suffix = ".jpg"
@@ -246,7 +359,7 @@ def guess_suffix(file_: Path) -> str:
         return ""
 
 
-def is_image(file_: Path) -> bool:
+def is_image(file_: Path, content: bytes | ResourceContent | None = None) -> bool:
     """
     >>> is_image(Path(__file__))
     False
@@ -256,6 +369,8 @@ def is_image(file_: Path) -> bool:
     False
     >>> is_image(Path("non/existing.png"))
     True
+    >>> is_image(Path("non/existing"), b"GIF89a")
+    True
     """
     # shortcut for known extensions
     # https://stackoverflow.com/a/57409327/7410886
@@ -265,7 +380,7 @@ def is_image(file_: Path) -> bool:
         # TODO: Convert ".svm" (StarView Metafile) to a more common format?
         return True
     try:
-        return puremagic.from_file(file_, mime=True).startswith("image/")
+        return magic_from_file(file_, mime=True, content=content).startswith("image/")
     except FileNotFoundError, IsADirectoryError, puremagic.main.PureError, ValueError:
         return False
 
@@ -345,7 +460,10 @@ def to_pascal_case(value: str) -> str:
 
 def md5_hash(file_: Path | str) -> str | None:
     try:
-        return hashlib.md5(Path(file_).read_bytes()).hexdigest()
+        # Don't convert paths. They might be inside an archive.
+        path = Path(file_) if isinstance(file_, str) else file_
+        with path.open("rb") as stream:
+            return hashlib.file_digest(stream, "md5").hexdigest()
     except FileNotFoundError:
         return None
 
@@ -463,46 +581,375 @@ def get_single_child_folder(parent_folder: Path) -> Path:
     return child_folders[0]
 
 
+class ScratchSpaceExceededError(Exception):
+    """The temporary files would exceed the maximum scratch space size."""
+
+
+class ScratchSpace:
+    """
+    Manage the temporary files of a conversion. All temporary folders are created
+    inside a single folder, which gets removed at the end of the conversion.
+    The written bytes are accounted centrally, also by the worker processes.
+    """
+
+    def __init__(self):
+        # Parent of the scratch folder. If None, the system's temporary folder is used.
+        self.parent_folder: Path | None = None
+        # maximum size in bytes
+        self.max_size: int | None = None
+        self._folder: Path | None = None
+        self._owner_pid: int | None = None
+        # bytes written to the scratch space, shared with the worker processes
+        self._used_size: Any = None
+
+    def configure(self, parent_folder: Path | None = None, max_size: int | None = None):
+        self.cleanup()
+        self.parent_folder = parent_folder
+        self.max_size = max_size
+        self._used_size = None
+
+    @property
+    def folder(self) -> Path:
+        if self._folder is None:
+            if self.parent_folder is not None:
+                self.parent_folder.mkdir(parents=True, exist_ok=True)
+            self._folder = Path(tempfile.mkdtemp(prefix="jimmy_", dir=self.parent_folder))
+            self._owner_pid = os.getpid()
+            LOGGER.debug(f'Using scratch folder "{self._folder}"')
+        return self._folder
+
+    @property
+    def used_size(self) -> Any:
+        if self._used_size is None:
+            self._used_size = multiprocessing.Value("q", 0)
+        return self._used_size
+
+    def reserve(self, size: int):
+        """
+        Account "size" more bytes before they are written.
+        Fail early if they don't fit into the scratch space.
+        """
+        with self.used_size.get_lock():
+            used = self.used_size.value + size
+            if self.max_size is not None and used > self.max_size:
+                raise ScratchSpaceExceededError(
+                    f"Scratch space exceeded. At least {used / 1024**2:.1f} MiB "
+                    f"are required, but only {self.max_size / 1024**2:.1f} MiB are allowed. "
+                    'Change the limit by "--max-scratch-size".'
+                )
+            self.used_size.value = used
+
+    def add(self, path: Path):
+        """Account a file or folder, which was written by an external tool."""
+        if path.is_file():
+            self.reserve(path.stat().st_size)
+        elif path.is_dir():
+            self.reserve(sum(file_.stat().st_size for file_ in path.rglob("*") if file_.is_file()))
+
+    def new_folder(self) -> Path:
+        return Path(tempfile.mkdtemp(dir=self.folder))
+
+    def get_state(self) -> tuple[Path, int | None, Any]:
+        """Get the state that is needed to use the scratch space in a worker process."""
+        return self.folder, self.max_size, self.used_size
+
+    def attach(self, folder: Path, max_size: int | None, used_size: Any):
+        """Use the scratch space of the main process. It's removed only by the main process."""
+        self._folder = folder
+        self.max_size = max_size
+        self._used_size = used_size
+        self._owner_pid = None
+
+    def cleanup(self):
+        # Child processes inherit the folder, but don't own it.
+        if self._folder is not None and self._owner_pid == os.getpid():
+            LOGGER.debug(f'Removing scratch folder "{self._folder}"')
+            shutil.rmtree(self._folder, ignore_errors=True)
+            self._used_size = None
+        self._folder = None
+
+
+SCRATCH_SPACE = ScratchSpace()
+# Remove the temporary files also if the conversion was aborted.
+atexit.register(SCRATCH_SPACE.cleanup)
+
+
 def get_temp_folder() -> Path:
-    """Return a temporary folder."""
-    temp_folder = Path(tempfile.gettempdir()) / f"jimmy_{int(time.time() * 10**6)}"
-    temp_folder.mkdir(exist_ok=True)
-    return temp_folder
+    """Return a new temporary folder inside the scratch space."""
+    return SCRATCH_SPACE.new_folder()
 
 
-def extract_gzip(input_: Path, temp_folder: Path | None = None) -> Path:
-    """Extract a gzip file to a new temporary directory."""
-    # TODO: Can there be multiple files or folders?
-    if temp_folder is None:
-        temp_folder = get_temp_folder()
-    unzipped_file = temp_folder / input_.stem
-    with gzip.open(input_, "rb") as gzip_file:
-        unzipped_file.write_bytes(gzip_file.read())
-    return unzipped_file
+class ResourceContent(abc.ABC):
+    """
+    Content of a resource, which isn't available as regular file.
+    It's opened only when needed, for example by the writer.
+    """
+
+    size: int
+    md5: str
+
+    @abc.abstractmethod
+    def open(self) -> BinaryIO:
+        """Open the content for reading."""
+
 
+class SpooledContent(ResourceContent):
+    """
+    Content that is available only in memory, like a base64 encoded image.
+    Small content is kept in memory. Larger content is written to the
+    scratch space. This way, the memory usage stays bounded until the
+    resources are written.
+
+    >>> content = SpooledContent(b"GIF89a")
+    >>> content.size, content.md5
+    (6, '1ac2109d47dbc72551f71df89d01ed18')
+    >>> with content.open() as stream:
+    ...     stream.read()
+    b'GIF89a'
+    """
+
+    # maximum size in bytes that is kept in memory
+    max_memory_size = 64 * 1024
+
+    def __init__(self, data: bytes):
+        self.size = len(data)
+        self.md5 = hashlib.md5(data).hexdigest()
+        self._data: bytes | None = None
+        self._path: Path | None = None
+        if self.size <= self.max_memory_size:
+            self._data = data
+        else:
+            SCRATCH_SPACE.reserve(self.size)
+            file_descriptor, path = tempfile.mkstemp(dir=SCRATCH_SPACE.folder)
+            with open(file_descriptor, "wb") as file_:
+                file_.write(data)
+            self._path = Path(path)
+
+    def open(self) -> BinaryIO:
+        if self._path is not None:
+            return self._path.open("rb")
+        assert self._data is not None
+        return io.BytesIO(self._data)
+
+
+class TarMemberContent(ResourceContent):
+    """
+    Content of a file inside a tar archive. The archive is read in place,
+    so it needs to stay open until the content is written.
+    """
 
-def extract_tar(input_: Path) -> Path:
-    """Extract a tar file to a new temporary directory."""
+    def __init__(self, tar_file: tarfile.TarFile, member: tarfile.TarInfo):
+        self.tar_file = tar_file
+        self.member = member
+        self.size = member.size
+        with self.open() as stream:
+            self.md5 = hashlib.file_digest(cast(io.BufferedIOBase, stream), "md5").hexdigest()
+
+    def open(self) -> BinaryIO:
+        if (stream := self.tar_file.extractfile(self.member)) is None:
+            raise FileNotFoundError(f'"{self.member.name}" is not a regular file.')
+        return cast(BinaryIO, stream)
+
+
+def log_extraction_throughput(input_: Path, size: int, start_time: float):
+    duration = time.perf_counter() - start_time
+    size_mib = size / 1024**2
+    LOGGER.debug(
+        f'Extracted {size_mib:.1f} MiB from "{input_.name}" in {duration:.1f} s '
+        f"({size_mib / max(duration, 1e-6):.1f} MiB/s)"
+    )
+
+
+def extract_tar(input_: Path, include: str | None = None) -> Path:
+    """
+    Extract a tar file to a new temporary directory. If "include" is specified,
+    extract only the members matching this pattern, like "Takeout/Keep/*".
+    """
     temp_folder = get_temp_folder()
+    start_time = time.perf_counter()
+    extracted_size = 0
     with tarfile.open(input_) as tar_ref:
-        tar_ref.extractall(temp_folder, filter="data")
+
+        def iter_members() -> Iterator[tarfile.TarInfo]:
+            # Filter while iterating. This way, compressed archives are read only once.
+            nonlocal extracted_size
+            for member in tar_ref:
+                if include is None or fnmatch.fnmatchcase(member.name, include):
+                    # The total size is unknown beforehand. Check each member instead.
+                    SCRATCH_SPACE.reserve(member.size)
+                    extracted_size += member.size
+                    yield member
+
+        tar_ref.extractall(temp_folder, members=iter_members(), filter="data")
+    log_extraction_throughput(input_, extracted_size, start_time)
     return temp_folder
 
 
+def extract_zip_members(input_: Path, members: list[zipfile.ZipInfo], temp_folder: Path):
+    # Each job needs its own file handle.
+    with zipfile.ZipFile(input_) as zip_ref:
+        zip_ref.extractall(temp_folder, members=members)
+
+
 def extract_zip(
-    input_: Path, file_to_extract: str | None = None, temp_folder: Path | None = None
+    input_: Path,
+    file_to_extract: str | None = None,
+    temp_folder: Path | None = None,
+    include: str | None = None,
+    jobs: int = 1,
 ) -> Path:
-    """Extract a zip file to a new temporary directory."""
+    """
+    Extract a zip file to a new temporary directory. If "include" is specified,
+    extract only the members matching this pattern, like "Takeout/Keep/*".
+    """
     if temp_folder is None:
         temp_folder = get_temp_folder()
+    start_time = time.perf_counter()
     with zipfile.ZipFile(input_) as zip_ref:
-        if file_to_extract is None:
-            zip_ref.extractall(temp_folder)
+        if file_to_extract is not None:
+            members = [zip_ref.getinfo(file_to_extract)]
         else:
-            zip_ref.extract(file_to_extract, temp_folder)
+            members = [
+                m
+                for m in zip_ref.infolist()
+                if include is None or fnmatch.fnmatchcase(m.filename, include)
+            ]
+
+        SCRATCH_SPACE.reserve(sum(m.file_size for m in members))
+        if jobs <= 1:
+            zip_ref.extractall(temp_folder, members=members)
+
+    if jobs > 1:
+        # Decompression releases the GIL. Each job extracts a similar amount of data.
+        member_chunks = distribute(members, [m.file_size for m in members], jobs)
+        for _ in map_parallel(
+            extract_zip_members,
+            [input_] * len(member_chunks),
+            member_chunks,
+            [temp_folder] * len(member_chunks),
+            jobs=jobs,
+        ):
+            pass
+    log_extraction_throughput(input_, sum(m.file_size for m in members), start_time)
     return temp_folder
 
 
+# Archives that are read in place. They are needed until the notes are written.
+OPEN_ARCHIVES: list[zipfile.ZipFile | tarfile.TarFile] = []
+
+
+def close_archives():
+    while OPEN_ARCHIVES:
+        OPEN_ARCHIVES.pop().close()
+
+
+def open_tar(input_: Path) -> tarfile.TarFile:
+    """
+    Open a tar archive to read it in place.
+    It's kept open until "close_archives()" is called.
+    """
+    tar_file = tarfile.open(input_)  # noqa: SIM115 # closed by close_archives()
+    OPEN_ARCHIVES.append(tar_file)
+    return tar_file
+
+
+class ArchivePath(Path):
+    """
+    Read-only path inside a zip archive. The archive is read in place, i. e.
+    it doesn't need to be extracted. Only reading files, listing folders and
+    getting the status are supported. Paths outside of the archive are accessed
+    on the filesystem. The archive is kept open until "close_archives()" is called.
+    """
+
+    def __init__(self, *args, archive: zipfile.Path | None = None):
+        super().__init__(*args)
+        if archive is None:
+            zip_file = zipfile.ZipFile(self)
+            OPEN_ARCHIVES.append(zip_file)
+            archive = zipfile.Path(zip_file)
+        # The root of the archive is shared between all derived paths.
+        self.archive = archive
+
+    def with_segments(self, *pathsegments):
+        return type(self)(*pathsegments, archive=self.archive)
+
+    @property
+    def member(self) -> zipfile.Path | None:
+        """Get the corresponding archive member or None if the path is outside."""
+        archive_file = Path(self.archive.root.filename or "")
+        if not self.is_relative_to(archive_file):
+            return None
+        return self.archive.joinpath(*self.relative_to(archive_file).parts)
+
+    def from_member(self, member: zipfile.Path) -> ArchivePath:
+        return self.with_segments(self.archive.root.filename or "", member.at)
+
+    def iterdir(self):
+        if (member := self.member) is None:
+            return super().iterdir()
+        return map(self.from_member, member.iterdir())
+
+    def glob(self, pattern, **kwargs):
+        if (member := self.member) is None:
+            return super().glob(pattern, **kwargs)
+        return map(self.from_member, member.glob(str(pattern)))
+
+    def rglob(self, pattern, **kwargs):
+        if (member := self.member) is None:
+            return super().rglob(pattern, **kwargs)
+        return map(self.from_member, member.rglob(str(pattern)))
+
+    def exists(self, **kwargs) -> bool:
+        if (member := self.member) is None:
+            return super().exists(**kwargs)
+        # The root isn't listed in the archive.
+        return not member.at or member.exists()
+
+    def is_file(self, **kwargs) -> bool:
+        member = self.member
+        return super().is_file(**kwargs) if member is None else member.is_file()
+
+    def is_dir(self, **kwargs) -> bool:
+        member = self.member
+        return super().is_dir(**kwargs) if member is None else member.is_dir()
+
+    def open(self, mode="r", buffering=-1, encoding=None, errors=None, newline=None):
+        if (member := self.member) is None:
+            return super().open(mode, buffering, encoding, errors, newline)
+        if "b" in mode:
+            return member.open(mode)
+        return member.open(mode, encoding=encoding, errors=errors, newline=newline)
+
+    def read_bytes(self) -> bytes:
+        with self.open("rb") as file_:
+            return file_.read()
+
+    def read_text(self, encoding=None, errors=None, newline=None) -> str:
+        with self.open(encoding=encoding, errors=errors, newline=newline) as file_:
+            return file_.read()
+
+    def stat(self, *, follow_symlinks=True) -> os.stat_result:
+        if (member := self.member) is None:
+            return super().stat(follow_symlinks=follow_symlinks)
+        if not self.exists():
+            raise FileNotFoundError(f"No such archive member: '{self}'")
+        try:
+            info = self.archive.root.getinfo(member.at)
+            size, mtime = info.file_size, time.mktime((*info.date_time, 0, 0, -1))
+        except KeyError:
+            # Implicit folders and the root have no info. Take the time of the archive.
+            size, mtime = 0, Path(self.archive.root.filename or "").stat().st_mtime
+        mode = stat.S_IFDIR | 0o555 if member.is_dir() else stat.S_IFREG | 0o444
+        # mode, ino, dev, nlink, uid, gid, size, atime, mtime, ctime
+        return os.stat_result((mode, 0, 0, 1, 0, 0, size, mtime, mtime, mtime))
+
+    def absolute(self) -> ArchivePath:
+        return self if self.member is not None else super().absolute()
+
+    def resolve(self, strict=False) -> ArchivePath:
+        return self if self.member is not None else super().resolve(strict)
+
+
 def find_file_recursively(
     root_folder: Path, url: str, try_suffixes: tuple[str, ...] | None = None
 ) -> Path | None:
@@ -522,6 +969,192 @@ def find_file_recursively(
     return potential_matches[0]
 
 
+###########################################################
+# streaming parsers
+###########################################################
+
+
+class JsonReader:
+    """
+    Read a big JSON document incrementally. Containers can be iterated element by element.
+    Only the currently decoded value is kept in memory.
+
+    >>> import io
+    >>> reader = JsonReader(io.StringIO('{"a": 1, "b": [{"c": 2}, 3], "d": null}'), 4)
+    >>> for key in reader.iter_object():
+    ...     if key == "b":
+    ...         print(list(reader.iter_array()))
+    [{'c': 2}, 3]
+    >>> reader = JsonReader(io.StringIO("[[1, 2], [3]]"))
+    >>> for _ in reader.iter_array(decode=False):
+    ...     print(sum(reader.iter_array()))
+    3
+    3
+    >>> list(JsonReader(io.StringIO("[12345, 1.5e3, []]"), 3).iter_array())
+    [12345, 1500.0, []]
+    >>> JsonReader(io.StringIO("[1, 2")).read_value()
+    Traceback (most recent call last):
+      ...
+    json.decoder.JSONDecodeError: Expecting ',' delimiter: line 1 column 6 (char 5)
+    """
+
+    WHITESPACE = re.compile(r"[ \t\n\r]*")
+    NUMBER_TAIL = re.compile(r"[0-9.eE+-]*\Z")
+    # everything except brackets, including complete strings
+    NON_STRUCTURAL = re.compile(r'(?:[^"\[\]{}]+|"[^"\\]*(?:\\.[^"\\]*)*")*')
+    DECODER = json.JSONDecoder()
+
+    def __init__(self, stream: TextIO, chunk_size: int = 1024**2):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.index = 0  # current index in the buffer
+        self.offset = 0  # offset of the buffer in the stream
+        self.eof = False
+
+    @property
+    def position(self) -> int:
+        return self.offset + self.index
+
+    def read_chunk(self, size: int):
+        # drop the consumed part of the buffer
+        self.offset += self.index
+        self.buffer = self.buffer[self.index :]
+        self.index = 0
+        chunk = self.stream.read(size)
+        self.buffer += chunk
+        self.eof = not chunk
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character."""
+        while True:
+            self.index = self.WHITESPACE.match(self.buffer, self.index).end()  # type: ignore[union-attr]
+            if self.index < len(self.buffer):
+                return self.buffer[self.index]
+            if self.eof:
+                raise json.JSONDecodeError("Unexpected end of data", self.buffer, self.index)
+            self.read_chunk(self.chunk_size)
+
+    def expect(self, characters: str) -> str:
+        character = self.peek()
+        if character not in characters:
+            raise json.JSONDecodeError(f"Expecting one of {characters!r}", self.buffer, self.index)
+        self.index += 1
+        return character
+
+    def read_value(self) -> Any:
+        """Decode the next value completely."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.DECODER.raw_decode(self.buffer, self.index)
+                # A number at the end of the buffer may be incomplete.
+                if self.eof or not self.NUMBER_TAIL.match(self.buffer, end):
+                    self.index = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Grow the buffer exponentially to avoid decoding big values too often.
+            self.read_chunk(max(self.chunk_size, len(self.buffer)))
+
+    def skip_value(self):
+        """Skip the next value without decoding it."""
+        if self.peek() not in "[{":
+            self.read_value()
+            return
+        # Scan only the structure of containers. Strings are skipped as a whole,
+        # because they may contain brackets.
+        depth = 0
+        while True:
+            self.index = self.NON_STRUCTURAL.match(self.buffer, self.index).end()  # type: ignore[union-attr]
+            if self.index == len(self.buffer) or self.buffer[self.index] == '"':
+                # container or string is incomplete
+                if self.eof:
+                    raise json.JSONDecodeError("Unterminated value", self.buffer, self.index)
+                self.read_chunk(max(self.chunk_size, len(self.buffer)))
+                continue
+            depth += 1 if self.buffer[self.index] in "[{" else -1
+            self.index += 1
+            if depth == 0:
+                return
+
+    def iter_array(self, decode: bool = True) -> Iterator[Any]:
+        """
+        Iterate over the elements of the next array. If "decode" is false, the caller
+        has to consume each element completely or not at all. Unconsumed elements are skipped.
+        """
+        self.expect("[")
+        if self.peek() == "]":
+            self.index += 1
+            return
+        while True:
+            if decode:
+                yield self.read_value()
+            else:
+                self.peek()  # skip whitespace to detect whether the element was consumed
+                position = self.position
+                yield None
+                if self.position == position:
+                    self.skip_value()
+            if self.expect(",]") == "]":
+                return
+
+    def iter_object(self) -> Iterator[str]:
+        """
+        Iterate over the keys of the next object. The caller has to consume
+        each value completely or not at all. Unconsumed values are skipped.
+        """
+        self.expect("{")
+        if self.peek() == "}":
+            self.index += 1
+            return
+        while True:
+            key = self.read_value()
+            self.expect(":")
+            self.peek()  # skip whitespace to detect whether the value was consumed
+            position = self.position
+            yield key
+            if self.position == position:
+                self.skip_value()
+            if self.expect(",}") == "}":
+                return
+
+
+def iter_json_array(file_: Path) -> Iterator[Any]:
+    """Iterate over the elements of a JSON array without loading the complete file."""
+    with file_.open(encoding="utf-8") as stream:
+        yield from JsonReader(stream).iter_array()
+
+
+def iter_xml_elements(
+    file_: Path | BinaryIO, depth: int = 1, namespaces: dict[str, str] | None = None
+) -> Iterator[tuple[ET.Element, ET.Element]]:
+    """
+    Iterate over the XML elements at the given depth without loading the complete file.
+    The root is at depth 0. Each element is yielded with its parent, when it's complete.
+    It's removed from the parent afterwards. Namespaces are collected if requested.
+
+    >>> import io
+    >>> xml = b"<a><b><c>1</c><c>2</c></b><b><c>3</c></b></a>"
+    >>> [(c.text, b.tag) for c, b in iter_xml_elements(io.BytesIO(xml), depth=2)]
+    [('1', 'b'), ('2', 'b'), ('3', 'b')]
+    """
+    ancestors: list[ET.Element] = []
+    for event, element in ET.iterparse(file_, events=("start-ns", "start", "end")):
+        match event:
+            case "start-ns" if namespaces is not None:
+                prefix, uri = element
+                namespaces[prefix] = uri
+            case "start":
+                ancestors.append(element)
+            case "end":
+                ancestors.pop()
+                if len(ancestors) == depth:
+                    yield element, ancestors[-1]
+                    ancestors[-1].remove(element)
+
+
 ###########################################################
 # datetime helpers
 ###########################################################
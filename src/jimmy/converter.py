@@ -1,8 +1,11 @@
 """Provides the base class for all converters."""
 
 import abc
+from collections.abc import Callable, Iterable, Iterator
+import functools
 import logging
 from pathlib import Path
+from typing import Any
 from xml.etree import ElementTree as ET
 
 import frontmatter
@@ -39,6 +42,12 @@ class BaseConverter(abc.ABC):
         self.root_notebook: imf.Notebook
         self.root_path: Path
         self.output_folder = config.output_folder
+        self.jobs = config.jobs
+        # Extract only the matching archive members. Useful for big archives, like Takeout.
+        self.archive_include: str | None = None
+        # Read zip archives in place instead of extracting them. Only possible if the
+        # converter accesses the files by the methods of "common.ArchivePath".
+        self.read_archive_in_place = False
 
     def prepare_input(self, input_: Path) -> Path:
         """Prepare the input for further processing. For example extract an archive."""
@@ -48,14 +57,24 @@ class BaseConverter(abc.ABC):
         # define some generally useful conversions
         suffixes = [s.lower() for s in input_.suffixes]
         if suffixes[-1] in (".bear2bk", ".textpack"):
-            temp_folder = common.extract_zip(input_)
+            temp_folder = common.extract_zip(input_, jobs=self.jobs)
             return common.get_single_child_folder(temp_folder)
         if suffixes[-1] in (".jex", ".tar", ".tgz") or len(suffixes) > 1 and suffixes[-2] == ".tar":
-            return common.extract_tar(input_)
-        if suffixes[-1] in (".apkg", ".nsx", ".zip", ".zkn3"):
-            return common.extract_zip(input_)
-        # ".textbundle", folder
-        return input_
+            extract_archive: Callable[..., Path] = common.extract_tar
+        elif suffixes[-1] in (".apkg", ".nsx", ".zip", ".zkn3"):
+            if self.read_archive_in_place:
+                return common.ArchivePath(input_.resolve())
+            extract_archive = functools.partial(common.extract_zip, jobs=self.jobs)
+        else:
+            # ".textbundle", folder
+            return input_
+
+        if self.archive_include is not None:
+            temp_folder = extract_archive(input_, include=self.archive_include)
+            if any(temp_folder.iterdir()):
+                return temp_folder
+            self.logger.debug(f'No file matches "{self.archive_include}". Extracting all files.')
+        return extract_archive(input_)
 
     def has_valid_format(self, input_: Path) -> bool:
         """Check if the input has a valid format."""
@@ -89,6 +108,21 @@ class BaseConverter(abc.ABC):
             notebooks.append(self.root_notebook)
         return notebooks, errors
 
+    def convert_bodies[T](
+        self, convert_body: Callable[[T], Any], items: Iterable[T]
+    ) -> Iterator[tuple[T, Any]]:
+        """
+        Convert the bodies of the items in a thread pool. Yield each item with its
+        body in the original order. Failed conversions (None) are skipped.
+        Everything that extracts links has to be done afterwards by the caller,
+        because "md_lib.links.get_markdown_links()" isn't thread-safe.
+        """
+        items = list(items)
+        bodies = common.map_parallel(convert_body, items, jobs=self.jobs)
+        for item, body in zip(items, bodies, strict=True):
+            if body is not None:
+                yield item, body
+
     @abc.abstractmethod
     def convert_note(self, *args, **kwargs):
         """
@@ -168,6 +202,53 @@ def decode_strange_ascii(ascii_: str) -> str:
     return "".join(new_str)
 
 
+# pdf_oxide separates pages by a horizontal rule.
+PDF_PAGE_SEPARATOR = "\n---\n\n"
+
+
+def split_pages(page_count: int, chunks: int) -> list[range]:
+    """
+    Split the pages of a document into consecutive chunks of similar size.
+
+    >>> split_pages(5, 2)
+    [range(0, 3), range(3, 5)]
+    >>> split_pages(2, 4)
+    [range(0, 1), range(1, 2)]
+    >>> split_pages(0, 1)
+    []
+    """
+    chunk_size = max(1, -(-page_count // max(1, chunks)))  # ceil division
+    return [
+        range(start, min(start + chunk_size, page_count))
+        for start in range(0, page_count, chunk_size)
+    ]
+
+
+def pdf_document_to_markdown(
+    document: pdf_oxide.PdfDocument, pages: range, image_folder: Path
+) -> str:
+    """Convert the specified pages of an opened PDF document to Markdown."""
+    # https://pdf.oxide.fyi/docs/extraction/markdown
+    body = PDF_PAGE_SEPARATOR.join(
+        document.to_markdown(
+            page,
+            detect_headings=True,
+            include_images=True,
+            image_output_dir=str(image_folder),
+            embed_images=False,
+        )
+        for page in pages
+    )
+    common.SCRATCH_SPACE.add(image_folder)
+    return body
+
+
+def pdf_to_markdown(file_: Path, password: str | None, pages: range, image_folder: Path) -> str:
+    """Convert the specified pages of a PDF document to Markdown."""
+    document = pdf_oxide.PdfDocument(str(file_), password=password)
+    return pdf_document_to_markdown(document, pages, image_folder)
+
+
 class DefaultConverter(BaseConverter):
     def __init__(self, config: common.Config, *args, **kwargs):
         super().__init__(config, *args, **kwargs)
@@ -175,6 +256,7 @@ class DefaultConverter(BaseConverter):
         self.resource_folder = common.get_temp_folder()
 
         self.password = config.password
+        self.max_pdf_pages = config.max_pdf_pages
 
     def handle_markdown_links(self, body: str, path: Path) -> tuple[imf.Resources, imf.NoteLinks]:
         note_links = []
@@ -263,7 +345,7 @@ class DefaultConverter(BaseConverter):
                     extra_args=["--shift-heading-level-by=1"],
                 )
             case "eml" | "mht" | "mhtml":
-                note_imf = jimmy.md_lib.eml.eml_to_note(file_, self.resource_folder)
+                note_imf = jimmy.md_lib.eml.eml_to_note(file_)
                 parent.child_notes.append(note_imf)
                 return  # don't use the common conversion
             case "fountain":
@@ -293,26 +375,44 @@ class DefaultConverter(BaseConverter):
                         case _:
                             note_imf.custom_metadata[key] = value
             case "pdf":
-                # https://pdf.oxide.fyi/docs/extraction/markdown
                 # TODO: OCR
                 document = pdf_oxide.PdfDocument(str(file_), password=self.password)
                 # if self.password is not None and not document.authenticate(self.password):
                 #     self.debug("Password set, but not applied.")
-                note_imf.body = document.to_markdown_all(
-                    detect_headings=True,
-                    include_images=True,
-                    image_output_dir=str(self.resource_folder),
-                    embed_images=False,
-                )
+                page_count = int(document.page_count)
+                if self.max_pdf_pages is not None and page_count > self.max_pdf_pages:
+                    self.logger.debug(f"Converting only {self.max_pdf_pages}/{page_count} pages")
+                    page_count = self.max_pdf_pages
+                # Each job converts a consecutive chunk of pages. This way, the document
+                # needs to be parsed only once per job.
+                page_chunks = split_pages(page_count, self.jobs)
+                # Each chunk gets its own image folder to account its size.
+                image_folders = [
+                    jimmy.md_lib.convert.new_media_folder(self.resource_folder) for _ in page_chunks
+                ]
+                if len(page_chunks) == 1:
+                    # Reuse the opened document. A process pool isn't worth it.
+                    note_imf.body = pdf_document_to_markdown(
+                        document, page_chunks[0], image_folders[0]
+                    )
+                else:
+                    note_imf.body = PDF_PAGE_SEPARATOR.join(
+                        common.map_parallel(
+                            pdf_to_markdown,
+                            [file_] * len(page_chunks),
+                            [self.password] * len(page_chunks),
+                            page_chunks,
+                            image_folders,
+                            jobs=min(self.jobs, len(page_chunks)),
+                            processes=True,
+                        )
+                    )
             case "txt" | "text":
                 note_imf.body = file_.read_text(encoding="utf-8")
-            case "docx" | "odt":
+            case "docx" | "epub" | "odt":
                 # binary format, supported by pandoc
-                note_imf.body = jimmy.md_lib.convert.markup_to_markdown(
-                    file_.read_bytes(),
-                    pwd=file_.parent,
-                    format_=format_,
-                    resource_folder=self.resource_folder,
+                note_imf.body = jimmy.md_lib.convert.markup_file_to_markdown(
+                    file_, format_=format_, resource_folder=self.resource_folder
                 )
             case "xml":
                 root = ET.parse(file_).getroot()
@@ -337,9 +437,7 @@ class DefaultConverter(BaseConverter):
                     case _:
                         note_imf.body = file_.read_text(encoding="utf-8")
             case _:  # last resort
-                pandoc_format = jimmy.md_lib.convert.PANDOC_INPUT_FORMAT_MAP.get(
-                    format_, format_
-                )
+                pandoc_format = jimmy.md_lib.convert.PANDOC_INPUT_FORMAT_MAP.get(format_, format_)
                 note_imf.body = jimmy.md_lib.convert.markup_to_markdown(
                     file_.read_text(encoding="utf-8"),
                     pwd=file_.parent,
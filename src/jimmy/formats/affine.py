@@ -1,6 +1,7 @@
 """Convert Affine notes to the intermediate format."""
 
 from pathlib import Path
+import shutil
 import sqlite3
 
 import pycrdt
@@ -41,6 +42,47 @@ def convert_table(block):
     return table_md.create_md()
 
 
+@common.catch_all_exceptions
+def decode_blocks(doc_bytes: bytes | None) -> dict | None:
+    """
+    Decode the blocks of a page snapshot to plain Python objects.
+    Decoding is CPU bound, so this can be done in a process pool.
+    Return None if there is no snapshot or it can't be decoded.
+    """
+    if doc_bytes is None:
+        return None
+    doc: pycrdt.Doc = pycrdt.Doc()
+    doc.apply_update(doc_bytes)
+    return doc.get("blocks", type=pycrdt.Map).to_py()
+
+
+class BlobStore:
+    """
+    Provide lazy access to the blobs of a workspace. Only the keys are loaded
+    initially. The data is read only if a page references it.
+    """
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+        try:
+            self.key_rowid_map = dict(connection.execute("SELECT key, rowid FROM blobs"))
+        except sqlite3.OperationalError:
+            self.key_rowid_map = {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.key_rowid_map
+
+    def write(self, key: str, path: Path):
+        """Stream a blob to a file by SQLite incremental blob I/O."""
+        with (
+            self.connection.blobopen(
+                "blobs", "data", self.key_rowid_map[key], readonly=True
+            ) as blob,
+            path.open("wb") as file_,
+        ):
+            shutil.copyfileobj(blob, file_)
+
+
 class Converter(converter.BaseConverter):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -51,8 +93,8 @@ class Converter(converter.BaseConverter):
     def convert_note(
         self,
         page: dict,
-        metas: dict,
-        blobs_by_key: dict,
+        blocks_map: dict | None,
+        blob_store: BlobStore,
         all_tags: dict,
         parent_notebook: imf.Notebook,
     ):  # pylint: disable=too-many-arguments,too-many-positional-arguments
@@ -66,14 +108,10 @@ class Converter(converter.BaseConverter):
             original_id=page_id,
         )
 
-        if (doc_bytes := metas.get(page_id)) is None:
-            self.logger.warning("no snapshot found")
+        if blocks_map is None:
+            self.logger.warning("no valid snapshot found")
             return
-
-        doc: pycrdt.Doc = pycrdt.Doc()
-        doc.apply_update(doc_bytes)
-
-        if not (blocks_map := doc.get("blocks", type=pycrdt.Map)):
+        if not blocks_map:
             self.logger.warning("no blocks found")
             return
         # find the root block "affine:page"
@@ -90,13 +128,13 @@ class Converter(converter.BaseConverter):
         for _bid, block in blocks_map.items():
             # Images: prop:sourceId references a blob.key
             src_id = block.get("prop:sourceId")
-            if src_id and src_id in blobs_by_key:
-                ext = common.guess_suffix(blobs_by_key[src_id]["mime"])
-
-                # write resource to filesystem
-                resource_path = self.resource_folder / f"{src_id}{ext}"
-                resource_path = common.get_unique_path(resource_path, blobs_by_key[src_id]["data"])
-                resource_path.write_bytes(blobs_by_key[src_id]["data"])
+            if src_id and src_id in blob_store:
+                # Write the resource to the filesystem. The blob key is unique,
+                # so the blob needs to be written only once.
+                resource_path = self.resource_folder / src_id
+                if not resource_path.is_file():
+                    blob_store.write(src_id, resource_path)
+                    common.SCRATCH_SPACE.add(resource_path)
 
                 # link resource to markdown note
                 note_imf.resources.append(
@@ -205,15 +243,8 @@ class Converter(converter.BaseConverter):
         cur.execute("SELECT doc_id, data FROM snapshots")
         metas = dict(cur.fetchall())
 
-        # Load the blobs table (for attachments)
-        try:
-            cur.execute("SELECT key, data, mime, size FROM blobs")
-            blobs_by_key = {
-                key: {"data": data, "mime": mime, "size": size}
-                for key, data, mime, size in cur.fetchall()
-            }
-        except sqlite3.OperationalError:
-            blobs_by_key = {}
+        # The blobs table (for attachments) is accessed lazily.
+        blob_store = BlobStore(conn)
 
         # Find the meta doc (workspace), which has the page list and tags
         meta = None
@@ -241,5 +272,12 @@ class Converter(converter.BaseConverter):
 
         # second pass: create notes
         pages = meta.get("pages", [])
-        for page in pages:
-            self.convert_note(page, metas, blobs_by_key, all_tags, parent_notebook=root_notebook)
+        blocks_per_page = common.map_parallel(
+            decode_blocks,
+            [metas.get(page.get("id")) for page in pages],
+            jobs=self.jobs,
+            processes=True,
+        )
+        for page, blocks_map in zip(pages, blocks_per_page, strict=True):
+            self.convert_note(page, blocks_map, blob_store, all_tags, parent_notebook=root_notebook)
+        conn.close()
@@ -9,6 +9,8 @@ from jimmy import common, converter, intermediate_format as imf
 
 IMAGE_RE = re.compile(r"(<img src=\"(.*?)\"(?:>| >| \/>))")
 SOUND_RE = re.compile(r"(\[sound:(.*?)\])")
+# number of notes that are fetched from the database at once
+FETCH_BATCH_SIZE = 1000
 
 
 def get_images(body: str) -> list[tuple[str, str]]:
@@ -31,48 +33,62 @@ def get_sounds(body: str) -> list[tuple[str, str]]:
     return SOUND_RE.findall(body)
 
 
+def get_body(field_names: list[str], fields: str) -> str | None:
+    r"""
+    Convert the fields of a note to a Markdown list.
+    Return None if the fields don't match the model.
+
+    >>> get_body(["Front", "Back"], "a<br>\nb\x1f<div>c</div>&nbsp;d")
+    '- Front: a\nb\n- Back: c d'
+    >>> get_body(["Front"], "a\x1fb")
+    """
+    values = fields.split("\x1f")
+    if len(values) != len(field_names):
+        return None
+    template_replacements = dict(zip(field_names, values, strict=True))
+
+    # TODO: Templates are too complex for pandoc conversion.
+    # Just take the replacements for now.
+    # def replace(templ, replacements):
+    #     for key, value in replacements.items():
+    #         templ = templ.replace(f"{{{{{key}}}}}", value + " ")
+    #     return templ
+
+    # for template in model["tmpls"]:
+    #     front = replace(template["qfmt"], template_replacements)
+    #     template_replacements["FrontSide"] = front
+
+    #     # treat the backside as complete note
+    #     back = (
+    #         model["css"]
+    #         + "\n\n"
+    #         + replace(template["afmt"], template_replacements)
+    #     )
+    #     body = jimmy.md_lib.convert.markup_to_markdown(back)
+    body_md = "\n".join([f"- {key}: {value}" for key, value in template_replacements.items()])
+    # cleanup
+    return (
+        body_md.replace("<br>\n", "\n")
+        .replace("&nbsp;", " ")
+        .replace("<div>", "")
+        .replace("</div>", "")
+    )
+
+
 # TODO
 # pylint: disable=too-many-arguments,too-many-positional-arguments
 class Converter(converter.BaseConverter):
     @common.catch_all_exceptions
-    def convert_note(self, note_index, db_row, models, media_dict, note_deck_id_map):
+    def convert_note(self, note_index, db_row, body_md, media_dict, deck_id_notebook_map):
         # TODO: Anki doesn't have note names. Find a robust note name.
         # The index is a bit better readeable than the original_id.
         title = f"note_{note_index:010}"
         self.logger.debug(f'Converting note "{title}"')
 
-        (created, original_id, model_id, updated, tags, data) = db_row
-        model = models[str(model_id)]
-        template_replacements = dict(
-            zip([f["name"] for f in model["flds"]], data.split("\x1f"), strict=True)
-        )
-
-        # TODO: Templates are too complex for pandoc conversion.
-        # Just take the replacements for now.
-        # def replace(templ, replacements):
-        #     for key, value in replacements.items():
-        #         templ = templ.replace(f"{{{{{key}}}}}", value + " ")
-        #     return templ
-
-        # for template in model["tmpls"]:
-        #     front = replace(template["qfmt"], template_replacements)
-        #     template_replacements["FrontSide"] = front
-
-        #     # treat the backside as complete note
-        #     back = (
-        #         model["css"]
-        #         + "\n\n"
-        #         + replace(template["afmt"], template_replacements)
-        #     )
-        #     body = jimmy.md_lib.convert.markup_to_markdown(back)
-        body_md = "\n".join([f"- {key}: {value}" for key, value in template_replacements.items()])
-        # cleanup
-        body_md = (
-            body_md.replace("<br>\n", "\n")
-            .replace("&nbsp;", " ")
-            .replace("<div>", "")
-            .replace("</div>", "")
-        )
+        (created, original_id, _, updated, tags, _, deck_id) = db_row
+        if body_md is None:
+            self.logger.warning(f'"{title}": Fields don\'t match the model. Skipping note.')
+            return
 
         # find images, sounds and other attachments
         resources = []
@@ -95,14 +111,9 @@ class Converter(converter.BaseConverter):
             tags=[imf.Tag(t) for t in tags.strip().split(" ") if t],
         )
 
-        found_parent_notebook = False
-        parent_deck_id = note_deck_id_map.get(str(created))
-        for notebook in self.root_notebook.child_notebooks:
-            if notebook.original_id == parent_deck_id:
-                notebook.child_notes.append(note_imf)
-                found_parent_notebook = True
-                break
-        if not found_parent_notebook:
+        if (parent_notebook := deck_id_notebook_map.get(str(deck_id))) is not None:
+            parent_notebook.child_notes.append(note_imf)
+        else:
             self.root_notebook.child_notes.append(note_imf)
 
     def convert(self, file_or_folder: Path):
@@ -130,28 +141,36 @@ class Converter(converter.BaseConverter):
         # models
         # https://github.com/ankidroid/Anki-Android/wiki/Database-Structure#models-jsonobjects
         models = json.loads(collection[9])
+        model_id_field_names_map = {
+            model_id: [field["name"] for field in model["flds"]]
+            for model_id, model in models.items()
+        }
 
         # decks
         # https://github.com/ankidroid/Anki-Android/wiki/Database-Structure#decks-jsonobjects
         decks = json.loads(collection[10])
         # TODO: nested decks
+        deck_id_notebook_map = {}
         for deck_id, deck in decks.items():
-            self.root_notebook.child_notebooks.append(
-                imf.Notebook(deck["name"], original_id=str(deck_id))
-            )
+            notebook = imf.Notebook(deck["name"], original_id=str(deck_id))
+            self.root_notebook.child_notebooks.append(notebook)
+            deck_id_notebook_map[str(deck_id)] = notebook
 
-        # cards
-        # https://github.com/ankidroid/Anki-Android/wiki/Database-Structure#cards
-        note_deck_id_map = {}
-        for note_id, deck_id in cur.execute("select nid, did from cards"):
-            note_deck_id_map[str(note_id)] = str(deck_id)
-
-        # notes
+        # notes and their deck (taken from the last card of the note)
         # https://github.com/ankidroid/Anki-Android/wiki/Database-Structure#notes
-        for note_index, db_row in enumerate(
-            cur.execute("select id, guid, mid, mod, tags, flds from notes")
-        ):
-            self.convert_note(note_index, db_row, models, media_dict, note_deck_id_map)
+        # https://github.com/ankidroid/Anki-Android/wiki/Database-Structure#cards
+        cur.execute(
+            "select id, guid, mid, mod, tags, flds, "
+            "(select did from cards where cards.nid = notes.id order by cards.id desc limit 1) "
+            "from notes"
+        )
+        note_index = 0
+        while db_rows := cur.fetchmany(FETCH_BATCH_SIZE):
+            for db_row in db_rows:
+                body_md = get_body(model_id_field_names_map.get(str(db_row[2]), []), db_row[5])
+                self.convert_note(note_index, db_row, body_md, media_dict, deck_id_notebook_map)
+                note_index += 1
+        conn.close()
 
         # Don't export empty notebooks
         self.remove_empty_notebooks()
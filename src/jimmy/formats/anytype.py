@@ -19,6 +19,7 @@ class Converter(converter.BaseConverter):
 
         anytype_converter = AnytypeConverter(self.root_path, intermediate_markdown_folder)
         anytype_converter.process_all_files()
+        common.SCRATCH_SPACE.add(intermediate_markdown_folder)
 
         # read the markdown again to respect settings like a custom resource folder
         markdown_converter = converter.DefaultConverter(self._config)
@@ -1,10 +1,10 @@
 """Convert cherrytree notes to the intermediate format."""
 
+import base64
 from collections import defaultdict
 import logging
 from pathlib import Path
 import re
-import xml.etree.ElementTree as ET  # noqa: N817
 
 from jimmy import common, converter, intermediate_format as imf
 import jimmy.md_lib.links
@@ -170,7 +170,7 @@ def convert_rich_text(rich_text, heading_on_line: bool):
     return md_content, note_links, heading_on_line and "\n" not in md_content
 
 
-def convert_png(node, resource_folder) -> tuple[str, imf.Resource]:
+def convert_png(node) -> tuple[str, imf.Resource]:
     # It seems like the <encoded_png> attribute doesn't only cover PNG, but also
     # arbitrary attachments.
 
@@ -178,16 +178,16 @@ def convert_png(node, resource_folder) -> tuple[str, imf.Resource]:
     original_name = node.attrib.get("filename")
 
     # Use the original filename if possible.
-    temp_filename = resource_folder / (
-        common.unique_title() if original_name is None else original_name
-    )
-    temp_filename = common.write_base64(temp_filename, node.text)
+    filename = Path(common.unique_title() if original_name is None else original_name)
 
     # assemble the markdown
-    resource_md = jimmy.md_lib.links.make_link(
-        temp_filename.name, str(temp_filename), is_image=True
+    resource_md = jimmy.md_lib.links.make_link(filename.name, str(filename), is_image=True)
+    resource_imf = imf.Resource(
+        filename,
+        resource_md,
+        filename.name,
+        content=common.SpooledContent(base64.b64decode(node.text)),
     )
-    resource_imf = imf.Resource(temp_filename, resource_md, temp_filename.name)
     return resource_md, resource_imf
 
 
@@ -245,7 +245,7 @@ class Converter(converter.BaseConverter):
                         continue
                     # We could handle resources here already,
                     # but we do it later with the common function.
-                    resource_md, resource_imf = convert_png(child, self.root_path)
+                    resource_md, resource_imf = convert_png(child)
                     offset_object_map[self.get_offset(child)].append(resource_md)
                     note_imf.resources.append(resource_imf)
                 case "table":
@@ -282,9 +282,8 @@ class Converter(converter.BaseConverter):
 
     @common.catch_all_exceptions
     def convert_ctd(self, ctd_file: Path, parent_notebook: imf.Notebook):
-        root_node = ET.parse(ctd_file).getroot()
-
-        for child in root_node:
+        # Stream the top level nodes. Their sub nodes are converted recursively.
+        for child, _ in common.iter_xml_elements(ctd_file):
             match child.tag:
                 case "bookmarks":
                     # We assume that bookmarks are defined before any nodes.
@@ -295,8 +294,6 @@ class Converter(converter.BaseConverter):
                     self.logger.debug(f"ignoring tag {child.tag}")
 
     def convert(self, file_or_folder: Path):
-        self.root_path = common.get_temp_folder()
-
         if file_or_folder.is_file():
             self.convert_ctd(file_or_folder, self.root_notebook)
         else:  # folder of .ctd
@@ -1,10 +1,13 @@
 """Convert ColorNote notes to the intermediate format."""
 
+from collections.abc import Iterable, Iterator
 import hashlib
 import io
 import json
+import logging
 from pathlib import Path
 import struct
+from typing import BinaryIO
 
 from cryptography.hazmat.primitives import padding
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
@@ -13,6 +16,48 @@ from jimmy import common, converter, intermediate_format as imf
 import jimmy.md_lib.colornote
 import jimmy.md_lib.links
 
+LOGGER = logging.getLogger("jimmy")
+# Number of bytes that are decrypted at once.
+BLOCK_SIZE = 2**16
+# '{"_id":'
+FIRST_NOTE_START = bytes.fromhex("7b225f6964223a")
+
+
+def iter_chunks(plaintext_blocks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Yield the JSON chunks of the decrypted backup as soon as they are complete.
+
+    >>> list(iter_chunks([b"??\\x00\\x00\\x00\\x09{", b'"_id":1}\\x00\\x00', b"\\x00\\x02{}"]))
+    [b'{"_id":1}', b'{}']
+    """
+    buffer = bytearray()
+    is_first_note_found = False
+    for block in plaintext_blocks:
+        buffer += block
+        if not is_first_note_found:
+            # TODO: Meaning of the bytes before? Looks similar to the iv.
+            if (first_note_index := buffer.find(FIRST_NOTE_START)) == -1:
+                # Keep only the bytes that could belong to the first note.
+                del buffer[: -(len(FIRST_NOTE_START) - 1 + 4)]
+                continue
+            del buffer[: first_note_index - 4]
+            is_first_note_found = True
+
+        # parse binary colornote format
+        # 4 bytes: chunk length
+        # chunk length bytes: json data
+        while len(buffer) >= 4:
+            chunk_length = struct.unpack_from(">L", buffer)[0]
+            if len(buffer) < 4 + chunk_length:
+                break  # incomplete chunk
+            yield bytes(buffer[4 : 4 + chunk_length])
+            del buffer[: 4 + chunk_length]
+
+    if not is_first_note_found:
+        LOGGER.error("Couldn't find start position of the first note.")
+    elif buffer:
+        LOGGER.debug(f"Ignoring {len(buffer)} trailing bytes.")
+
 
 class Converter(converter.BaseConverter):
     def __init__(self, config: common.Config):
@@ -34,24 +79,54 @@ class Converter(converter.BaseConverter):
             f"Metadata: {note_count} notes exported at {date} with version {major}.{minor}"
         )
 
-    def decrypt(self, salt: bytes, password: bytes, ciphertext: bytes) -> bytes | None:
+    def is_padding_valid(self, key: bytes, iv: bytes, backup_file: BinaryIO) -> bool:
+        """
+        Check the padding of the last block before anything is decrypted.
+        In CBC mode, the last block can be decrypted with the previous block as IV.
+        """
+        start = backup_file.tell()
+        size = backup_file.seek(0, io.SEEK_END) - start
+        block_size = algorithms.AES128.block_size // 8
+        if size == 0 or size % block_size != 0:
+            self.logger.debug(f"Invalid ciphertext length: {size}")
+            return False
+        if size > block_size:
+            backup_file.seek(-2 * block_size, io.SEEK_END)
+            iv = backup_file.read(block_size)
+        last_block = backup_file.read(block_size)
+        backup_file.seek(start)
+
+        decryptor = Cipher(algorithms.AES128(key), modes.CBC(iv)).decryptor()
+        unpadder = padding.PKCS7(algorithms.AES128.block_size).unpadder()
+        try:
+            unpadder.update(decryptor.update(last_block) + decryptor.finalize())
+            unpadder.finalize()
+        except ValueError as exc:
+            self.logger.debug(exc, exc_info=True)
+            return False
+        return True
+
+    def decrypt(
+        self, salt: bytes, password: bytes, backup_file: BinaryIO
+    ) -> Iterator[bytes] | None:
         # decrypting is based on:
         # https://github.com/olejorgenb/ColorNote-backup-decryptor/blob/61e105d6f13b2cd22b5141b6334bb098617665e1/src/ColorNoteBackupDecrypt.java
         key = hashlib.md5(password + salt).digest()
         iv = hashlib.md5(key + password + salt).digest()
+        if not self.is_padding_valid(key, iv, backup_file):
+            return None
 
         cipher = Cipher(algorithms.AES128(key), modes.CBC(iv))
         decryptor = cipher.decryptor()
-        plaintext_padded = decryptor.update(ciphertext) + decryptor.finalize()
-
         unpadder = padding.PKCS7(cipher.algorithm.block_size).unpadder()
-        try:
-            plaintext = unpadder.update(plaintext_padded) + unpadder.finalize()
-            return plaintext
-        except ValueError as exc:
-            self.logger.error("Decrypting failed. Wrong password?")
-            self.logger.debug(exc, exc_info=True)
-            return None
+
+        def iter_plaintext_blocks() -> Iterator[bytes]:
+            # Decrypt block by block to keep the memory usage low.
+            while ciphertext := backup_file.read(BLOCK_SIZE):
+                yield unpadder.update(decryptor.update(ciphertext))
+            yield unpadder.update(decryptor.finalize()) + unpadder.finalize()
+
+        return iter_plaintext_blocks()
 
     def handle_links(self, body: str) -> imf.NoteLinks:
         # only internal links
@@ -128,37 +203,19 @@ class Converter(converter.BaseConverter):
             self.password = "0000"
             self.logger.warning("No password given. Trying with default password '0000'.")
 
-        ciphertext = file_or_folder.read_bytes()
-
-        self.parse_metadata(ciphertext[:28])
-        plaintext = self.decrypt(
-            b"ColorNote Fixed Salt", self.password.encode("utf-8"), ciphertext[28:]
-        )
-        if plaintext is None:
-            return
-
-        plaintext_stream = io.BytesIO(plaintext)
-
-        # search for '{"_id":'
-        # TODO: Meaning of the bytes before? Looks similar to the iv.
-        first_note_index = plaintext.find(bytearray.fromhex("7b225f6964223a"))
-        if first_note_index == -1:
-            self.logger.error("Couldn't find start position of the first note.")
-            return
-
-        self.root_notebook.child_notebooks.extend(
-            [self.calendar_notebook, self.archive_notebook, self.trash_notebook]
-        )
-
-        plaintext_stream.read(first_note_index - 4)
-        while chunk_length_bytes := plaintext_stream.read(4):
-            # parse binary colornote format
-            # 4 bytes: chunk length
-            # chunk length bytes: json data
-            chunk_length = struct.unpack(">L", chunk_length_bytes)[0]
-            chunk_bytes = plaintext_stream.read(chunk_length)
-            note_json = json.loads(chunk_bytes.decode("utf-8"))
-
-            self.convert_note(note_json)
+        with file_or_folder.open("rb") as backup_file:
+            self.parse_metadata(backup_file.read(28))
+            plaintext_blocks = self.decrypt(
+                b"ColorNote Fixed Salt", self.password.encode("utf-8"), backup_file
+            )
+            if plaintext_blocks is None:
+                self.logger.error("Decrypting failed. Wrong password?")
+                return
+
+            self.root_notebook.child_notebooks.extend(
+                [self.calendar_notebook, self.archive_notebook, self.trash_notebook]
+            )
+            for chunk in iter_chunks(plaintext_blocks):
+                self.convert_note(json.loads(chunk.decode("utf-8")))
 
         self.remove_empty_notebooks()
@@ -1,5 +1,6 @@
 """Convert Day One notes to the intermediate format."""
 
+import collections
 import json
 from pathlib import Path
 
@@ -7,6 +8,17 @@ from jimmy import common, converter, intermediate_format as imf
 import jimmy.md_lib.links
 
 
+def index_media_folder(folder: Path) -> dict[str, list[Path]]:
+    """Map the md5 checksums to the media files. They are named like "<md5>.<suffix>"."""
+    md5_files_map = collections.defaultdict(list)
+    if folder.is_dir():
+        for file_ in folder.iterdir():
+            md5, dot, _ = file_.name.partition(".")
+            if dot:
+                md5_files_map[md5].append(file_)
+    return md5_files_map
+
+
 class Converter(converter.BaseConverter):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -24,6 +36,11 @@ class Converter(converter.BaseConverter):
             "photos": {},
             "videos": {},
         }
+        # List each media folder only once.
+        folder_indices = {
+            folder_name: index_media_folder(self.root_path / folder_name)
+            for folder_name in ("audios", "pdfs", "photos", "videos")
+        }
 
         for entry in entries:
             for json_key_name, actual_map in resource_id_filename_maps.items():
@@ -35,7 +52,7 @@ class Converter(converter.BaseConverter):
                             f"ID {resource.get('identifier')}. Skipping resource."
                         )
                         continue
-                    potential_matches = list((self.root_path / folder_name).glob(f"{md5}.*"))
+                    potential_matches = folder_indices[folder_name].get(md5, [])
                     if len(potential_matches) == 0:
                         self.logger.warning(f"Couldn't find {folder_name} with md5 checksum {md5}")
                     elif len(potential_matches) == 1:
@@ -21,40 +21,42 @@ class Converter(converter.BaseConverter):
         self.locations = {}
         self.moods = {}
         self.tags = {}
+        self.folder_uid_notebook_map: dict[str | None, imf.Notebook] = {}
 
-    def parse_metadata(self, root_node):
-        for table in root_node.findall("table"):
+    def parse_metadata(self, backup_file: Path):
+        for item, table in common.iter_xml_elements(backup_file, depth=2):
             table_name = table.attrib.get("name")
-            if table_name in ("diaro_entries", "diaro_folders", "diaro_templates"):
-                continue  # handle notes and notebooks later, ignore templates for now
-            for item in table:
-                match table_name:
-                    case "diaro_attachments":
-                        # entry_uid is the ID of the target note.
-                        # uid seems to be not needed.
-                        if not (filename := get_text(item.find("filename"))):
-                            self.logger.debug("Empty filename. Ignore ressource.")
-                            continue
-                        if not (type_ := get_text(item.find("type"))):
-                            self.logger.debug("Empty type. Ignore ressource.")
-                            continue
-                        self.attachments[get_text(item.find("entry_uid"))].append(
-                            imf.Resource(self.root_path / "media" / type_ / filename)
-                        )
-                    case "diaro_locations":
-                        if (latitude := get_text(item.find("lat"))) and (
-                            longitude := get_text(item.find("lng"))
-                        ):
-                            self.locations[get_text(item.find("uid"))] = {
-                                "latitude": latitude,
-                                "longitude": longitude,
-                            }
-                    case "diaro_moods":
-                        self.moods[get_text(item.find("uid"))] = get_text(item.find("title"))
-                    case "diaro_tags":
-                        self.tags[get_text(item.find("uid"))] = get_text(item.find("title"))
-                    case _:
-                        self.logger.debug(f'Ignoring table "{table_name}"')
+            match table_name:
+                case "diaro_entries" | "diaro_templates":
+                    pass  # handle notes later, ignore templates for now
+                case "diaro_folders":
+                    self.convert_notebook(item)
+                case "diaro_attachments":
+                    # entry_uid is the ID of the target note.
+                    # uid seems to be not needed.
+                    if not (filename := get_text(item.find("filename"))):
+                        self.logger.debug("Empty filename. Ignore ressource.")
+                        continue
+                    if not (type_ := get_text(item.find("type"))):
+                        self.logger.debug("Empty type. Ignore ressource.")
+                        continue
+                    self.attachments[get_text(item.find("entry_uid"))].append(
+                        imf.Resource(self.root_path / "media" / type_ / filename)
+                    )
+                case "diaro_locations":
+                    if (latitude := get_text(item.find("lat"))) and (
+                        longitude := get_text(item.find("lng"))
+                    ):
+                        self.locations[get_text(item.find("uid"))] = {
+                            "latitude": latitude,
+                            "longitude": longitude,
+                        }
+                case "diaro_moods":
+                    self.moods[get_text(item.find("uid"))] = get_text(item.find("title"))
+                case "diaro_tags":
+                    self.tags[get_text(item.find("uid"))] = get_text(item.find("title"))
+                case _:
+                    self.logger.debug(f'Ignoring table "{table_name}"')
 
     @common.catch_all_exceptions
     def convert_notebook(self, folder):
@@ -64,6 +66,7 @@ class Converter(converter.BaseConverter):
             original_id=get_text(folder.find("uid")),
         )
         self.root_notebook.child_notebooks.append(notebook)
+        self.folder_uid_notebook_map.setdefault(notebook.original_id, notebook)
 
     @common.catch_all_exceptions
     def convert_note(self, entry):
@@ -96,12 +99,9 @@ class Converter(converter.BaseConverter):
         note_imf.resources = self.attachments.get(note_imf.original_id, [])
 
         # folder
-        parent_folder_uid = get_text(entry.find("folder_uid"))
-        parent_notebook = self.root_notebook  # fallback
-        for potential_parent in self.root_notebook.child_notebooks:
-            if potential_parent.original_id == parent_folder_uid:
-                parent_notebook = potential_parent
-                break
+        parent_notebook = self.folder_uid_notebook_map.get(
+            get_text(entry.find("folder_uid")), self.root_notebook
+        )
         parent_notebook.child_notes.append(note_imf)
 
     def convert(self, file_or_folder: Path):
@@ -111,20 +111,15 @@ class Converter(converter.BaseConverter):
                 'Could not find "DiaroBackup.xml" file in zip. Is this really a Diaro backup?'
             )
             return
-        root_node = ET.parse(target_file).getroot()
+        # Only the start of the root element is needed.
+        _, root_node = next(ET.iterparse(target_file, events=("start",)))
         if int(version := root_node.attrib.get("version", "0")) != 2:
             self.logger.warning(f"Unsupported version: {version}")
 
-        self.parse_metadata(root_node)
-
-        folders = root_node.find("./table[@name='diaro_folders']")
-        if folders is not None:
-            for folder in folders:
-                self.convert_notebook(folder)
-
-        entries = root_node.find("./table[@name='diaro_entries']")
-        if entries is not None:
-            for entry in entries:
+        # Stream the backup twice. The entries reference all other tables.
+        self.parse_metadata(target_file)
+        for entry, table in common.iter_xml_elements(target_file, depth=2):
+            if table.attrib.get("name") == "diaro_entries":
                 self.convert_note(entry)
 
         # Don't export empty notebooks
@@ -5,7 +5,6 @@ Specification: https://evernote.com/blog/how-evernotes-xml-export-format-works
 
 import base64
 import collections
-import hashlib
 from pathlib import Path
 from urllib.parse import unquote
 import uuid
@@ -20,8 +19,6 @@ class Converter(converter.BaseConverter):
     def __init__(self, config: common.Config):
         super().__init__(config)
         self.password = config.password
-        # we need a resource folder to avoid writing files to the source folder
-        self.resource_folder = common.get_temp_folder()
         self.note_id_title_map: dict[str, str] = {}
 
     def handle_markdown_links(self, body: str) -> tuple[imf.Resources, imf.NoteLinks]:
@@ -44,19 +41,28 @@ class Converter(converter.BaseConverter):
             elif link.url.startswith("data:image/") and "base64" in link.url:
                 # inline resource
                 base64_data = link.url.split("base64,", 1)[1]  # TODO: make more robust
-                temp_filename = self.resource_folder / (
-                    common.unique_title() if link.text in [None, ""] else link.text
+                filename = Path(common.unique_title() if link.text in [None, ""] else link.text)
+                resources.append(
+                    imf.Resource(
+                        filename,
+                        str(link),
+                        link.text,
+                        content=common.SpooledContent(base64.b64decode(base64_data)),
+                    )
                 )
-                temp_filename = common.write_base64(temp_filename, base64_data)
-                resources.append(imf.Resource(temp_filename, str(link), link.text))
             elif link.url.startswith("data:image/svg+xml,"):
                 svg_data = unquote(link.url[len("data:image/svg+xml,") :])
-                temp_filename = self.resource_folder / (
+                filename = Path(
                     common.unique_title() + ".svg" if link.text in [None, ""] else link.text
                 )
-                temp_filename = common.get_unique_path(temp_filename, svg_data)
-                temp_filename.write_text(svg_data)
-                resources.append(imf.Resource(temp_filename, str(link), link.text))
+                resources.append(
+                    imf.Resource(
+                        filename,
+                        str(link),
+                        link.text,
+                        content=common.SpooledContent(svg_data.encode()),
+                    )
+                )
         return resources, note_links
 
     def link_notes_by_title(self):
@@ -120,24 +126,25 @@ class Converter(converter.BaseConverter):
                         continue
                     if (encoding := resource_data.get("encoding")) != "base64":
                         self.logger.debug(f"Unsupported encoding: {encoding}")
-                    temp_filename = self.resource_folder / (
+                    filename = Path(
                         common.unique_title()
                         if resource_title is None or not isinstance(resource_title.text, str)
                         else common.safe_path(resource_title.text)
                     )
-                    resource_data_decoded = base64.b64decode(resource_data.text)
-                    md5_hash = hashlib.md5(resource_data_decoded).hexdigest()
-                    temp_filename = common.write_base64(temp_filename, resource_data.text)
+                    resource_content = common.SpooledContent(base64.b64decode(resource_data.text))
+                    md5_hash = resource_content.md5
                     resource_title = (
                         resource_title if resource_title is None else resource_title.text
                     )
-                    if md5_hash in hashes:
-                        resource_md = f"![]({md5_hash})"
-                        note_imf.resources.append(
-                            imf.Resource(temp_filename, resource_md, resource_title)
+                    resource_md = f"![]({md5_hash})" if md5_hash in hashes else None
+                    note_imf.resources.append(
+                        imf.Resource(
+                            filename,
+                            resource_md,
+                            resource_title,
+                            content=resource_content,
                         )
-                    else:
-                        note_imf.resources.append(imf.Resource(temp_filename, None, resource_title))
+                    )
                 case "tag":
                     if isinstance(note_element.text, str):
                         note_imf.tags.append(imf.Tag(note_element.text))
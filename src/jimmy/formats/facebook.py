@@ -1,6 +1,5 @@
 """Convert Facebook posts and messages to the intermediate format."""
 
-import json
 from pathlib import Path
 
 from jimmy import common, converter, intermediate_format as imf
@@ -78,7 +77,7 @@ class Converter(converter.BaseConverter):
         self.root_notebook.child_notebooks.append(posts_notebook)
 
         for posts_file in posts_files:
-            for post in json.loads(posts_file.read_text(encoding="utf-8")):
+            for post in common.iter_json_array(posts_file):
                 updated_time = common.timestamp_to_datetime(post["timestamp"])
                 post_body = ""
 
@@ -165,6 +164,37 @@ class Converter(converter.BaseConverter):
                     self.logger.debug(f"Unsupported message item {message}.")
         return message_content
 
+    def read_conversation(self, reader: common.JsonReader) -> tuple[str, str | None] | None:
+        """Stream the messages of a conversation. Return None for group conversations."""
+        title = "Unknown"
+        note_body_str = None
+        for key in reader.iter_object():
+            match key:
+                case "participants":
+                    if len(reader.read_value()) > 2:
+                        return None
+                case "messages":
+                    note_body = []
+                    current_date = None
+                    for message in reader.iter_array():
+                        message_date = timestamp_to_date_str(message["timestamp_ms"] / 1000)
+                        if current_date is None or message_date != current_date:
+                            current_date = message_date
+                            note_body.append(f"## {message_date}")
+                        sender = (
+                            fix_encoding_error(message["sender_name"])
+                            if message["sender_name"]
+                            else "Unknown"
+                        )
+
+                        message_content = self.get_message_content(message)
+                        note_body.append(f"**{sender}**: {fix_encoding_error(message_content)}")
+                    note_body_str = "\n\n".join(note_body)
+                case "title":
+                    if title_raw := reader.read_value():
+                        title = fix_encoding_error(title_raw)
+        return title, note_body_str
+
     def convert_messages(self):
         messages_notebook = imf.Notebook("Messages")
         self.root_notebook.child_notebooks.append(messages_notebook)
@@ -180,39 +210,18 @@ class Converter(converter.BaseConverter):
             for file_index, conversation_file in enumerate(conversation_files):
                 # Keep the split of json files to prevent too large markdown files.
                 # (10000 messages per file)
-                conversation_json = json.loads(conversation_file.read_text(encoding="utf-8"))
-                if len(conversation_json.get("participants", [])) > 2:
+                with conversation_file.open(encoding="utf-8") as conversation_stream:
+                    conversation_json = self.read_conversation(
+                        common.JsonReader(conversation_stream)
+                    )
+                if conversation_json is None:
                     self.logger.debug(f"Skipping group conversation {conversation.name}.")
                     continue
-
-                messages = conversation_json.get("messages")
-
-                if messages is None:
+                title, note_body_str = conversation_json
+                if note_body_str is None:
                     self.logger.debug(f"No messages in {conversation_file}.")
                     continue
 
-                note_body = []
-                current_date = None
-                for message in messages:
-                    message_date = timestamp_to_date_str(message["timestamp_ms"] / 1000)
-                    if current_date is None or message_date != current_date:
-                        current_date = message_date
-                        note_body.append(f"## {message_date}")
-                    sender = (
-                        fix_encoding_error(message["sender_name"])
-                        if message["sender_name"]
-                        else "Unknown"
-                    )
-
-                    message_content = self.get_message_content(message)
-                    note_body.append(f"**{sender}**: {fix_encoding_error(message_content)}")
-                note_body_str = "\n\n".join(note_body)
-
-                title = (
-                    fix_encoding_error(conversation_json["title"])
-                    if conversation_json["title"]
-                    else "Unknown"
-                )
                 if file_index != 0:
                     title = f"{title} ({file_index})"
 
@@ -7,6 +7,11 @@ from jimmy.converter import DefaultConverter
 
 
 class Converter(converter.BaseConverter):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Takeout may contain data of many other Google products.
+        self.archive_include = "Takeout/Drive/*"
+
     def convert_note(self):
         pass
 
@@ -10,6 +10,8 @@ import jimmy.md_lib.convert
 class Converter(converter.BaseConverter):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        # Takeout may contain data of many other Google products.
+        self.archive_include = "Takeout/Keep/*"
         self.archive_notebook = imf.Notebook("Archive")
         self.trash_notebook = imf.Notebook("Trash")
 
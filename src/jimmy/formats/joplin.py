@@ -3,14 +3,17 @@
 from collections import defaultdict
 import dataclasses
 import enum
+import logging
 import math
-import mimetypes
-from pathlib import Path
+from pathlib import Path, PurePosixPath
+import tarfile
 
 from jimmy import common, converter, intermediate_format as imf
 import jimmy.md_lib.links
 import jimmy.md_lib.text
 
+LOGGER = logging.getLogger("jimmy")
+
 
 class ItemType(enum.IntEnum):
     # https://joplinapp.org/api/references/rest_api/#item-type-ids
@@ -34,10 +37,105 @@ class ItemType(enum.IntEnum):
 
 @dataclasses.dataclass
 class JexRessource:
-    source_path: Path
+    member: tarfile.TarInfo | None
     target_name: str
 
 
+@dataclasses.dataclass
+class JexItem:
+    """A single item of a JEX archive, consisting of Markdown text and metadata."""
+
+    text: str
+    metadata: dict[str, str]
+
+
+@dataclasses.dataclass
+class JexTables:
+    """All relevant items of a JEX archive, grouped by their type."""
+
+    notes: list[JexItem] = dataclasses.field(default_factory=list)
+    folders: list[JexItem] = dataclasses.field(default_factory=list)
+    resources: list[JexItem] = dataclasses.field(default_factory=list)
+    tags: list[JexItem] = dataclasses.field(default_factory=list)
+    note_tags: list[JexItem] = dataclasses.field(default_factory=list)
+
+
+def parse_item(markdown_raw: str) -> JexItem:
+    r"""
+    >>> parse_item("title\n\nbody\n\nid: 123\ntype_: 1")
+    JexItem(text='title\n\nbody', metadata={'id': '123', 'type_': '1'})
+    >>> parse_item("id: 123")
+    JexItem(text='', metadata={'id': '123'})
+    """
+    try:
+        text, metadata_raw = markdown_raw.rsplit("\n\n", 1)
+    except ValueError:
+        text = ""
+        metadata_raw = markdown_raw
+    metadata_json = {}
+    for line in metadata_raw.split("\n"):
+        try:
+            key, value = line.split(": ", maxsplit=1)
+            metadata_json[key] = value
+        except ValueError:
+            continue
+    return JexItem(text, metadata_json)
+
+
+class JexReader:
+    """
+    Read a JEX archive (an uncompressed tar file) without extracting it.
+    Resources stay inside the archive. They are streamed to the output by the writer.
+    """
+
+    def __init__(self, tar_file: tarfile.TarFile):
+        self.tar_file = tar_file
+        # resource ID - tar member
+        self.resource_members: dict[str, tarfile.TarInfo] = {}
+        # tar member name - content
+        self.resource_contents: dict[str, common.TarMemberContent] = {}
+
+    def read_tables(self) -> JexTables:
+        """Read the metadata of all items in a single pass through the archive."""
+        items = []
+        for member in self.tar_file:
+            if not member.isfile():
+                continue
+            member_path = PurePosixPath(member.name)
+            if member_path.parent.name == "resources":
+                self.resource_members[member_path.stem] = member
+            elif member_path.suffix == ".md":
+                file_ = self.tar_file.extractfile(member)
+                assert file_ is not None
+                items.append((member.name, parse_item(file_.read().decode("utf-8"))))
+
+        tables = JexTables()
+        # The member order is arbitrary. Sort it to get reproducible results.
+        for _, item in sorted(items, key=lambda name_item: name_item[0]):
+            # https://joplinapp.org/help/api/references/rest_api/#item-type-ids
+            match ItemType(int(item.metadata["type_"])):
+                case ItemType.NOTE:
+                    tables.notes.append(item)
+                case ItemType.FOLDER:
+                    tables.folders.append(item)
+                case ItemType.RESOURCE:
+                    tables.resources.append(item)
+                case ItemType.TAG:
+                    tables.tags.append(item)
+                case ItemType.NOTE_TAG:
+                    tables.note_tags.append(item)
+                case type_:
+                    LOGGER.debug(f"Ignoring note type {type_}")
+        return tables
+
+    def get_resource_content(self, member: tarfile.TarInfo) -> common.TarMemberContent:
+        """Get the content of a resource. Each resource is hashed only once."""
+        if (content := self.resource_contents.get(member.name)) is None:
+            content = common.TarMemberContent(self.tar_file, member)
+            self.resource_contents[member.name] = content
+        return content
+
+
 class Converter(converter.BaseConverter):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -47,11 +145,18 @@ class Converter(converter.BaseConverter):
         self.resource_id_filename_map = {}
         self.tag_id_tag_map = {}
         self.note_tag_id_map = defaultdict(list)
+        self.jex_reader: JexReader
+
+    def prepare_input(self, input_: Path) -> Path:
+        # The archive is read directly by the JexReader.
+        return input_
 
-    def handle_markdown_links(self, body: str) -> tuple[imf.Resources, imf.NoteLinks]:
+    def handle_markdown_links(
+        self, links: list[jimmy.md_lib.links.MarkdownLink]
+    ) -> tuple[imf.Resources, imf.NoteLinks]:
         note_links = []
         resources = []
-        for link in jimmy.md_lib.links.get_markdown_links(body):
+        for link in links:
             if link.is_web_link or link.is_mail_link:
                 continue  # keep the original links
             # https://joplinapp.org/api/references/rest_api/#creating-a-note-with-a-specific-id
@@ -61,14 +166,17 @@ class Converter(converter.BaseConverter):
             if resource_jex is None:
                 # internal link
                 note_links.append(imf.NoteLink(str(link), link.url[2:], link.text))
+            elif resource_jex.member is None:
+                self.logger.warning(f'Resource "{link.url[2:]}" is not in the archive.')
             else:
                 # resource
                 resources.append(
                     imf.Resource(
-                        resource_jex.source_path,
+                        Path(resource_jex.member.name),
                         str(link),
                         link.text,
                         target_name=resource_jex.target_name,
+                        content=self.jex_reader.get_resource_content(resource_jex.member),
                     )
                 )
         return resources, note_links
@@ -101,55 +209,35 @@ class Converter(converter.BaseConverter):
         self.parent_id_note_map.append((metadata_json["parent_id"], note_imf))
 
     def parse_data(self):
-        for file_ in sorted(self.root_path.rglob("*.md")):
-            markdown_raw = file_.read_text(encoding="utf-8")
-            try:
-                text, metadata_raw = markdown_raw.rsplit("\n\n", 1)
-            except ValueError:
-                text = ""
-                metadata_raw = markdown_raw
-            metadata_json = {}
-            for line in metadata_raw.split("\n"):
-                try:
-                    key, value = line.split(": ", maxsplit=1)
-                    metadata_json[key] = value
-                except ValueError:
-                    continue
-
-            # https://joplinapp.org/help/api/references/rest_api/#item-type-ids
-            type_ = ItemType(int(metadata_json["type_"]))
-            if type_ == ItemType.NOTE:
-                self.convert_note(text, metadata_json)
-            elif type_ == ItemType.FOLDER:
-                notebook_imf = imf.Notebook(text.strip(), original_id=metadata_json["id"])
-                self.notebook_id_notebook_map[metadata_json["id"]] = notebook_imf
-                self.parent_id_notebooks_map[metadata_json["parent_id"]].append(notebook_imf)
-            elif type_ == ItemType.RESOURCE:
-                # TODO: some metadata is lost
-                if suffix_ext := metadata_json.get("file_extension"):
-                    guessed_suffix = "." + suffix_ext
-                elif (
-                    suffix_mime := mimetypes.guess_extension(metadata_json.get("mime", ""))
-                ) is not None:
-                    guessed_suffix = suffix_mime
-                else:
-                    guessed_suffix = ""
-                filename = Path(metadata_json["id"]).with_suffix(guessed_suffix)
-                self.resource_id_filename_map[metadata_json["id"]] = JexRessource(
-                    self.root_path / "resources" / filename, text
-                )
-            elif type_ == ItemType.TAG:
-                self.tag_id_tag_map[metadata_json["id"]] = imf.Tag(
-                    text.strip(), original_id=metadata_json["id"]
-                )
-            elif type_ == ItemType.NOTE_TAG:
-                self.note_tag_id_map[metadata_json["note_id"]].append(metadata_json["tag_id"])
-            else:
-                self.logger.debug(f"Ignoring note type {type_}")
+        tables = self.jex_reader.read_tables()
+        for item in tables.notes:
+            self.convert_note(item.text, item.metadata)
+        for item in tables.folders:
+            notebook_imf = imf.Notebook(item.text.strip(), original_id=item.metadata["id"])
+            self.notebook_id_notebook_map[item.metadata["id"]] = notebook_imf
+            self.parent_id_notebooks_map[item.metadata["parent_id"]].append(notebook_imf)
+        for item in tables.resources:
+            # TODO: some metadata is lost
+            self.resource_id_filename_map[item.metadata["id"]] = JexRessource(
+                self.jex_reader.resource_members.get(item.metadata["id"]), item.text
+            )
+        for item in tables.tags:
+            self.tag_id_tag_map[item.metadata["id"]] = imf.Tag(
+                item.text.strip(), original_id=item.metadata["id"]
+            )
+        for item in tables.note_tags:
+            self.note_tag_id_map[item.metadata["note_id"]].append(item.metadata["tag_id"])
 
     def convert_data(self):
         self.logger.info("Assign tags, resources and internal links")
-        for parent_id, note in self.parent_id_note_map:
+        # Parsing the note bodies is the most expensive part. Do it in parallel if requested.
+        links_per_note = common.map_parallel(
+            jimmy.md_lib.links.get_markdown_links,
+            [note.body for _, note in self.parent_id_note_map],
+            jobs=self.jobs,
+            processes=True,
+        )
+        for (parent_id, note), links in zip(self.parent_id_note_map, links_per_note, strict=True):
             # assign tags
             assert note.original_id is not None
             for tag_id in self.note_tag_id_map.get(note.original_id, []):
@@ -157,7 +245,7 @@ class Converter(converter.BaseConverter):
                     note.tags.append(tag)
 
             # resources and internal links
-            resources, note_links = self.handle_markdown_links(note.body)
+            resources, note_links = self.handle_markdown_links(links)
             note.resources = resources
             note.note_links = note_links
 
@@ -180,5 +268,7 @@ class Converter(converter.BaseConverter):
                 self.root_notebook.child_notebooks.extend(notebooks)
 
     def convert(self, file_or_folder: Path):
+        # The archive stays open until the resources are written.
+        self.jex_reader = JexReader(common.open_tar(file_or_folder))
         self.parse_data()
         self.convert_data()
@@ -1,5 +1,6 @@
 """Convert nimbus notes to the intermediate format."""
 
+import base64
 from pathlib import Path
 from urllib.parse import unquote
 
@@ -48,16 +49,15 @@ class Converter(converter.BaseConverter):
                 # TODO: Generalize for other mime types.
                 # For example "data:image/png;base64,"
                 base64_data = link.url[len("data:image/svg+xml;base64,") :]
-                original_name = link.text
-                temp_filename = root_folder / (original_name or common.unique_title())
-                temp_filename = common.write_base64(temp_filename, base64_data)
+                filename = Path(link.text or common.unique_title())
                 resources.append(
                     imf.Resource(
-                        temp_filename,
+                        filename,
                         jimmy.md_lib.links.make_link(
                             link.text, link.url, is_image=link.is_image
                         ),
-                        temp_filename.name,
+                        filename.name,
+                        content=common.SpooledContent(base64.b64decode(base64_data)),
                     )
                 )
             elif (
@@ -91,7 +91,6 @@ class Converter(converter.BaseConverter):
 
         # Use the filename only as fallback title,
         # because some characters might be replaced.
-        # TODO: soup is created for filtering again
         soup = BeautifulSoup(note_html, "html.parser")
         if (title_element := soup.find("title")) is not None and title_element.text:
             title = title_element.text
@@ -102,7 +101,7 @@ class Converter(converter.BaseConverter):
         note_imf = imf.Note(title, source_application=self.format, original_id=title)
 
         note_imf.body = jimmy.md_lib.convert.markup_to_markdown(
-            note_html,
+            soup,
             pwd=temp_folder_note,
             custom_filter=[
                 jimmy.md_lib.html_filter.nimbus_note_add_mark,
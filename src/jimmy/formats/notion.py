@@ -1,8 +1,8 @@
 """Convert notion notes to the intermediate format."""
 
-import io
 from pathlib import Path
 import shutil
+import tempfile
 from urllib.parse import unquote
 import zipfile
 
@@ -11,11 +11,16 @@ import jimmy.md_lib.convert
 import jimmy.md_lib.links
 import jimmy.md_lib.text
 
+# Nested zip files up to this size are spooled in memory. Larger ones go to disk.
+SPOOL_MAX_SIZE = 64 * 1024**2
+
 
 class Converter(converter.BaseConverter):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.id_path_map = {".": Path(".")}
+        # The notes are collected first and converted afterwards.
+        self.pending_notes: list[tuple[Path, str, str, imf.Notebook]] = []
 
     def prepare_input(self, input_: Path) -> Path:
         temp_folder = common.get_temp_folder()
@@ -25,15 +30,13 @@ class Converter(converter.BaseConverter):
             is_zip = [f.endswith(".zip") for f in zip_ref.namelist()]
             if all(is_zip):
                 # usual structure: zip of zips
-                for nested_zip_name in zip_ref.namelist():
-                    with zip_ref.open(nested_zip_name) as nested_zip:
-                        nested_zip_filedata = io.BytesIO(nested_zip.read())
-                        with zipfile.ZipFile(nested_zip_filedata) as nested_zip_ref:
-                            nested_zip_ref.extractall(temp_folder)
+                for nested_zip_info in zip_ref.infolist():
+                    self.extract_nested_zip(zip_ref, nested_zip_info, temp_folder)
                 temp_folder = common.get_single_child_folder(temp_folder)
             elif not any(is_zip):
                 # unusual structure: zipped files
                 # guess that the user extracted the outer zip already
+                common.SCRATCH_SPACE.reserve(sum(info.file_size for info in zip_ref.infolist()))
                 zip_ref.extractall(temp_folder)
             else:
                 # unusual structure: zipped files and other files
@@ -46,6 +49,35 @@ class Converter(converter.BaseConverter):
 
         return temp_folder
 
+    @staticmethod
+    def extract_nested_zip(
+        zip_ref: zipfile.ZipFile, nested_zip_info: zipfile.ZipInfo, temp_folder: Path
+    ):
+        """
+        Extract a zip file inside a zip file without loading it into memory.
+        Uncompressed members can be read directly, since they are seekable cheaply.
+        Compressed members are spooled to a temporary file first.
+        """
+
+        def extract_all(nested_zip_ref: zipfile.ZipFile):
+            common.SCRATCH_SPACE.reserve(sum(info.file_size for info in nested_zip_ref.infolist()))
+            nested_zip_ref.extractall(temp_folder)
+
+        with zip_ref.open(nested_zip_info) as nested_zip:
+            if nested_zip_info.compress_type == zipfile.ZIP_STORED:
+                with zipfile.ZipFile(nested_zip) as nested_zip_ref:
+                    extract_all(nested_zip_ref)
+                return
+            if nested_zip_info.file_size > SPOOL_MAX_SIZE:
+                # The spooled file is rolled over to the scratch space.
+                common.SCRATCH_SPACE.reserve(nested_zip_info.file_size)
+            with tempfile.SpooledTemporaryFile(
+                max_size=SPOOL_MAX_SIZE, dir=str(common.SCRATCH_SPACE.folder)
+            ) as spooled_zip:
+                shutil.copyfileobj(nested_zip, spooled_zip)
+                with zipfile.ZipFile(spooled_zip) as nested_zip_ref:
+                    extract_all(nested_zip_ref)
+
     def handle_markdown_links(self, body: str, item: Path) -> tuple[imf.Resources, imf.NoteLinks]:
         resources = []
         note_links = []
@@ -94,13 +126,16 @@ class Converter(converter.BaseConverter):
         if item.is_dir():
             child_notebook = imf.Notebook(title, original_id=id_)
             self.convert_directory(child_notebook)
-            # It can happen that the folder only contains resources.
-            # They are added to the note one level higher with the same name.
-            # In this case, the notebook is no longer of use.
-            if not child_notebook.is_empty():
-                parent_notebook.child_notebooks.append(child_notebook)
+            # Empty notebooks are removed after converting the notes.
+            parent_notebook.child_notebooks.append(child_notebook)
             return
 
+        # The conversion is delayed, since it's the expensive part.
+        self.pending_notes.append((item, title, id_, parent_notebook))
+
+    @common.catch_all_exceptions
+    def convert_body(self, pending_note: tuple[Path, str, str, imf.Notebook]) -> str:
+        item, title, *_ = pending_note
         self.logger.debug(f'Converting note "{title}"')
         body = item.read_text(encoding="utf-8")
         if item.suffix.lower() == ".html":
@@ -111,7 +146,11 @@ class Converter(converter.BaseConverter):
                 custom_filter=[jimmy.md_lib.html_filter.notion_streamline_lists],
             )
         _, body = jimmy.md_lib.text.split_title_from_body(body)
+        return body
 
+    @common.catch_all_exceptions
+    def add_note(self, item: Path, title: str, id_: str, body: str, parent_notebook: imf.Notebook):
+        # pylint: disable=too-many-arguments,too-many-positional-arguments
         # find links
         resources, note_links = self.handle_markdown_links(body, item)
 
@@ -133,4 +172,17 @@ class Converter(converter.BaseConverter):
 
     def convert(self, file_or_folder: Path):
         self.root_notebook.original_id = "."
+        # first pass: span the notebook tree and collect the notes
         self.convert_directory(self.root_notebook)
+
+        # second pass: convert the notes
+        for (item, title, id_, parent_notebook), body in self.convert_bodies(
+            self.convert_body, self.pending_notes
+        ):
+            self.add_note(item, title, id_, body, parent_notebook)
+        self.pending_notes = []
+
+        # It can happen that a folder only contains resources.
+        # They are added to the note one level higher with the same name.
+        # In this case, the notebook is no longer of use.
+        self.remove_empty_notebooks()
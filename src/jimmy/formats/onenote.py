@@ -11,12 +11,17 @@ from jimmy import common, converter, intermediate_format as imf
 import jimmy.md_lib.convert
 import jimmy.md_lib.links
 
+# maximum runtime of a single one2html process
+ONE2HTML_TIMEOUT_S = 600
+
 
 class Converter(converter.BaseConverter):
     def __init__(self, config: common.Config):
         super().__init__(config)
         self._input_note_index = 0
         self.temp_folder = common.get_temp_folder()
+        # The pages are collected first and converted afterwards.
+        self.pending_pages: list[tuple[Path, imf.Notebook]] = []
 
     def handle_markdown_links(
         self, body: str, note_path: Path
@@ -56,8 +61,11 @@ class Converter(converter.BaseConverter):
         # TODO: extract the two tags and the creation date
         metadata_div.decompose()
 
-    def convert_note(self, page: Path, parent: imf.Notebook):
+    @common.catch_all_exceptions
+    def convert_page(self, pending_page: tuple[Path, imf.Notebook]) -> tuple[str, str]:
+        """Convert a HTML page to a title and a Markdown body."""
         # note == page
+        page, _ = pending_page
         body = page.read_text(encoding="utf-8")
 
         # get best title
@@ -66,20 +74,24 @@ class Converter(converter.BaseConverter):
             title = title_element.text
         else:
             title = page.stem
-
-        note_imf = imf.Note(title, original_id=f"{page.parent.stem}/{title}")  # TODO: match by UUID
         self.logger.debug(f'Converting note "{title}"')
 
         self.extract_metadata(soup)
 
         # TODO: Strip title and extract date. This could be done in one2html already.
-        note_imf.body = jimmy.md_lib.convert.markup_to_markdown(str(soup), pwd=page.parent)
+        return title, jimmy.md_lib.convert.markup_to_markdown(soup, pwd=page.parent)
+
+    @common.catch_all_exceptions
+    def convert_note(self, page: Path, title: str, body: str, parent: imf.Notebook):
+        # TODO: match by UUID
+        note_imf = imf.Note(title, body, original_id=f"{page.parent.stem}/{title}")
 
         note_imf.resources, note_imf.note_links = self.handle_markdown_links(note_imf.body, page)
 
         parent.child_notes.append(note_imf)
 
-    def convert_section_to_markdown(self, file_or_folder: Path, notebook: imf.Notebook):
+    @common.catch_all_exceptions
+    def collect_section_pages(self, file_or_folder: Path, notebook: imf.Notebook):
         # section including TOC
         for item in sorted(file_or_folder.iterdir()):
             if item.is_file():
@@ -87,7 +99,7 @@ class Converter(converter.BaseConverter):
                 if item.suffix != ".html":
                     self.logger.debug(f'Ignoring unexpected file: "{item.name}".')
                     continue
-                self.convert_note(item, notebook)
+                self.pending_pages.append((item, notebook))
             else:
                 # section
                 self.logger.debug(f'Converting section: "{item.stem}"')
@@ -101,38 +113,71 @@ class Converter(converter.BaseConverter):
                     if sub_item.suffix != ".html":
                         self.logger.debug(f'Ignoring unexpected file: "{sub_item.name}".')
                         continue
-                    self.convert_note(sub_item, section)
+                    self.pending_pages.append((sub_item, section))
 
     @common.catch_all_exceptions
-    def convert_section_and_toc(self, file_or_folder: Path, parent: imf.Notebook):
+    def run_one2html(self, file_or_folder: Path, intermediate_html_folder: Path) -> bool:
         """
         Convert onenote sections (.one) and the TOC (.onetoc2) to HTML files in a folder hierarchy.
         Folders represent OneNote sections and files represent OneNote pages.
+        Return True if the conversion was successful. None means that it failed unexpectedly.
         """
-        intermediate_html_folder = self.temp_folder / str(self._input_note_index)
-        intermediate_html_folder.mkdir()
-        self._input_note_index += 1
-
-        # onenote -> HTML
         # fmt: off
-        proc = subprocess.run(
-            [
-                "one2html",
-                "--input", str(file_or_folder.resolve()),
-                "--output", str(intermediate_html_folder.resolve()),
-            ],
-            capture_output=True,
-            check=False,  # check is done manually afterwards
-            encoding="utf8",
-        )
+        try:
+            proc = subprocess.run(
+                [
+                    "one2html",
+                    "--input", str(file_or_folder.resolve()),
+                    "--output", str(intermediate_html_folder.resolve()),
+                ],
+                capture_output=True,
+                check=False,  # check is done manually afterwards
+                encoding="utf8",
+                timeout=ONE2HTML_TIMEOUT_S,
+            )
+        except subprocess.TimeoutExpired as exc:
+            self.logger.warning(
+                f'one2html timed out after {ONE2HTML_TIMEOUT_S} s: "{file_or_folder.name}"'
+            )
+            # The captured output isn't decoded on timeout.
+            if isinstance(stderr := exc.stderr or "", bytes):
+                stderr = stderr.decode("utf8", errors="replace")
+            self.logger.debug(stderr.strip())
+            return False
         # fmt: on
         if proc.returncode != 0:
             self.logger.warning(f"one2html error code: {proc.returncode}")
             self.logger.debug(proc.stderr.strip())
-            return
+            return False
+        return True
 
+    def convert_sections_and_tocs(self, files: list[Path], parent: imf.Notebook):
+        intermediate_html_folders = []
+        for _ in files:
+            intermediate_html_folder = self.temp_folder / str(self._input_note_index)
+            intermediate_html_folder.mkdir()
+            intermediate_html_folders.append(intermediate_html_folder)
+            self._input_note_index += 1
+
+        # onenote -> HTML
+        # The external processes are independent, so they can run in parallel.
+        successes = common.map_parallel(
+            self.run_one2html, files, intermediate_html_folders, jobs=self.jobs
+        )
+        for success, intermediate_html_folder in zip(
+            successes, intermediate_html_folders, strict=True
+        ):
+            common.SCRATCH_SPACE.add(intermediate_html_folder)
+            if success:
+                self.collect_section_pages(intermediate_html_folder, parent)
+
+    def convert_pages(self):
         # HTML -> Markdown
-        self.convert_section_to_markdown(intermediate_html_folder, parent)
+        for (page, parent), (title, body) in self.convert_bodies(
+            self.convert_page, self.pending_pages
+        ):
+            self.convert_note(page, title, body, parent)
+        self.pending_pages = []
 
     def convert_notebook(self, root_path: Path):
         # Only single notebooks can be exported.
@@ -141,6 +186,7 @@ class Converter(converter.BaseConverter):
         root_notebook = imf.Notebook(notebook_path.stem)
         self.logger.debug(f'Converting notebook: "{root_notebook.title}"')
         self.root_notebook.child_notebooks.append(root_notebook)
+        sections_and_tocs = []
         for item in sorted(notebook_path.iterdir()):
             if item.name == ".onetoc2":
                 # The root TOC seems to be named ".onetoc2".
@@ -152,14 +198,15 @@ class Converter(converter.BaseConverter):
             if item.suffix not in (".one", ".onetoc2"):
                 self.logger.debug(f'Ignoring unexpected file: "{item.name}".')
                 continue
-            self.convert_section_and_toc(item, root_notebook)
+            sections_and_tocs.append(item)
+        self.convert_sections_and_tocs(sections_and_tocs, root_notebook)
 
     def convert_file_or_folder(self, file_or_folder: Path):
         if file_or_folder.is_file():
             self.convert_notebook(self.root_path)
         else:
             for onenote_zip in file_or_folder.glob("*.zip"):
-                root_path = common.extract_zip(onenote_zip)
+                root_path = common.extract_zip(onenote_zip, jobs=self.jobs)
                 self.convert_notebook(root_path)
 
     def convert(self, file_or_folder: Path):
@@ -171,3 +218,4 @@ class Converter(converter.BaseConverter):
         self.logger.debug(f"Using one2html from: {shutil_path}")
         self.logger.debug(f'temp_folder: "{self.temp_folder}"')
         self.convert_file_or_folder(file_or_folder)
+        self.convert_pages()
@@ -9,44 +9,59 @@ from jimmy.md_lib.roam_research import roam_to_md
 import jimmy.md_lib.tags
 
 
+def parse_children(children, level=0):
+    body_roam = []
+    block_uids = []
+
+    for child in children:
+        string_ = child["string"]
+        block_uids.append(child["uid"])
+
+        if (heading_level := child.get("heading")) is not None:
+            # Reset indentation level at heading.
+            # Else the next lines would be rendered as code.
+            prefix = "#" * heading_level + " "
+            level = -1
+        elif string_.strip() == "---":
+            prefix = ""
+            level = -1
+        elif string_.startswith("```") and string_.endswith("```") and string_[-4] != "\n":
+            string_ = string_[:-3] + "\n" + string_[-3:]
+            prefix = ""
+        else:
+            prefix = " " * 4 * level + "- "
+
+        body_roam.append(prefix + string_)
+        child_body_roam, child_block_uids = parse_children(
+            child.get("children", []), level=level + 1
+        )
+        body_roam.extend(child_body_roam)
+        block_uids.extend(child_block_uids)
+    return body_roam, block_uids
+
+
+@common.catch_all_exceptions
+def render_page(page: dict) -> tuple[str, list[str], list[jimmy.md_lib.links.MarkdownLink]]:
+    """
+    Render the blocks of a page to Markdown. Return the body, the IDs of all blocks
+    and the links to other pages and blocks. Runs in a worker process.
+    """
+    body_roam, block_uids = parse_children(page.get("children", []))
+    links: list[jimmy.md_lib.links.MarkdownLink] = []
+    body_md = roam_to_md("\n".join(body_roam), links)
+    return body_md, block_uids, links
+
+
 class Converter(converter.BaseConverter):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.block_id_page_id_map = {}
         self.page_title_page_id_map = {}
-
-    def parse_children(self, children, level=0):
-        body_roam = []
-        block_uids = []
-
-        for child in children:
-            string_ = child["string"]
-            block_uids.append(child["uid"])
-
-            if (heading_level := child.get("heading")) is not None:
-                # Reset indentation level at heading.
-                # Else the next lines would be rendered as code.
-                prefix = "#" * heading_level + " "
-                level = -1
-            elif string_.strip() == "---":
-                prefix = ""
-                level = -1
-            elif string_.startswith("```") and string_.endswith("```") and string_[-4] != "\n":
-                string_ = string_[:-3] + "\n" + string_[-3:]
-                prefix = ""
-            else:
-                prefix = " " * 4 * level + "- "
-
-            body_roam.append(prefix + string_)
-            child_body_roam, child_block_uids = self.parse_children(
-                child.get("children", []), level=level + 1
-            )
-            body_roam.extend(child_body_roam)
-            block_uids.extend(child_block_uids)
-        return body_roam, block_uids
+        # note and the links of its page, for the second pass
+        self.page_links: list[tuple[imf.Note, list[jimmy.md_lib.links.MarkdownLink]]] = []
 
     @common.catch_all_exceptions
-    def convert_note(self, page):
+    def convert_note(self, page, body_md, block_ids, links):
         # title is the first line
         title = page["title"].strip()
         self.logger.debug(f'Converting note "{title}"')
@@ -62,14 +77,12 @@ class Converter(converter.BaseConverter):
         if (updated_time := page.get("edit-time")) is not None:
             note_imf.updated = common.timestamp_to_datetime(updated_time // (10**3))
 
-        body_roam, block_ids = self.parse_children(page.get("children", []))
-
         # for later note linking
         for block_id in block_ids:
             self.block_id_page_id_map[block_id] = page["uid"]
         self.page_title_page_id_map[title] = page["uid"]
+        self.page_links.append((note_imf, links))
 
-        body_md = roam_to_md("\n".join(body_roam))
         note_imf.body = body_md
 
         inline_tags = jimmy.md_lib.tags.get_inline_tags(note_imf.body, ["#"])
@@ -78,10 +91,8 @@ class Converter(converter.BaseConverter):
         self.root_notebook.child_notes.append(note_imf)
 
     def add_note_links(self):
-        for note in self.root_notebook.get_all_child_notes():
-            for link in jimmy.md_lib.links.get_markdown_links(note.body):
-                if link.is_web_link or link.is_mail_link:
-                    continue  # keep the original links
+        for note, links in self.page_links:
+            for link in links:
                 if link.url.startswith("roam-page://"):
                     linked_page_title = link.url[len("roam-page://") :]
                     if (
@@ -103,8 +114,13 @@ class Converter(converter.BaseConverter):
     def convert(self, file_or_folder: Path):
         input_json = json.loads(file_or_folder.read_text(encoding="utf-8"))
 
-        for page in input_json:
-            self.convert_note(page)
+        # Rendering the pages is the most expensive part. Do it in parallel if requested.
+        rendered_pages = common.map_parallel(
+            render_page, input_json, jobs=self.jobs, processes=True
+        )
+        for page, rendered_page in zip(input_json, rendered_pages, strict=True):
+            if rendered_page is not None:
+                self.convert_note(page, *rendered_page)
 
         # There are many empty notes, but don't remove them,
         # since this would break links.
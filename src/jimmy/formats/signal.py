@@ -1,21 +1,229 @@
 """Convert Signal chats to the intermediate format."""
 
+import base64
+import datetime as dt
+import hashlib
+import hmac
+import io
 from pathlib import Path
+from typing import BinaryIO, cast
 
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 import sigexport.create
+import sigexport.crypto
 import sigexport.data
 import sigexport.files
 import sigexport.models
+from sqlcipher3 import dbapi2
 
 from jimmy import common, converter, intermediate_format as imf
 import jimmy.md_lib.links
 
+# Limit the attachment names to account for the 255 character limit of most filesystems.
+MAX_ATTACHMENT_NAME_LENGTH = 200
+# Must be a multiple of the AES block size.
+DECRYPTION_CHUNK_SIZE = 1024**2
+
+
+def get_attachment_name(attachment: dict, date: str, index: int) -> str:
+    """
+    Get a unique name for an attachment. Similar to "sigexport.files.copy_attachments()".
+
+    >>> get_attachment_name({"fileName": "cat.png"}, "2024-01-02T03-04-05.678", 0)
+    '2024-01-02T03-04-05.678_00_cat.png'
+    >>> get_attachment_name({"contentType": "image/jpeg"}, "2024-01-02T03-04-05.678", 1)
+    '2024-01-02T03-04-05.678_01_None.jpeg'
+    >>> name = get_attachment_name({"fileName": "a" * 300 + ".pdf"}, "date", 2)
+    >>> len(name), name[-8:]
+    (208, 'aaaa.pdf')
+    """
+    file_name = str(attachment.get("fileName"))
+    if "." not in file_name:
+        file_name += "." + (attachment.get("contentType") or "").split("/")[-1]
+    if len(file_name) > MAX_ATTACHMENT_NAME_LENGTH:
+        # Keep the extension. It's needed to detect the file type.
+        stem, _, extension = file_name.rpartition(".")
+        extension = extension[: MAX_ATTACHMENT_NAME_LENGTH // 2]
+        file_name = f"{stem[: MAX_ATTACHMENT_NAME_LENGTH - len(extension) - 1]}.{extension}"
+    return f"{date}_{index:02}_{file_name}"
+
+
+def connect_database(source_folder: Path, key: str | None) -> dbapi2.Connection:
+    """
+    Connect to the encrypted Signal database. The settings are the same as in
+    "sigexport.data.fetch_data()", which doesn't expose its connection.
+    """
+    db = dbapi2.connect(str(source_folder / "sql" / "db.sqlite"))
+    # Parameter binding doesn't work for pragmas.
+    for pragma in (
+        f"KEY = \"x'{key}'\"",
+        "cipher_page_size = 4096",
+        "kdf_iter = 64000",
+        "cipher_hmac_algorithm = HMAC_SHA512",
+        "cipher_kdf_algorithm = PBKDF2_HMAC_SHA512",
+    ):
+        db.execute(f"PRAGMA {pragma}")
+    return db
+
+
+class DecryptedStream(io.RawIOBase):
+    """
+    Seekable stream of a decrypted attachment. In AES-CBC mode, each block can be
+    decrypted separately. Only the previous ciphertext block is needed as IV.
+    """
+
+    def __init__(self, source_file: Path, cipher_key: bytes, size: int):
+        super().__init__()
+        # The file starts with the IV, i. e. block n is preceded by its IV.
+        self.file = source_file.open("rb")
+        self.cipher_key = cipher_key
+        self.size = size
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.position, io.SEEK_END: self.size}[whence]
+        if base + offset < 0:
+            raise ValueError(f"Negative seek position {base + offset}")
+        self.position = base + offset
+        return self.position
+
+    def readinto(self, buffer) -> int:
+        length = min(len(buffer), self.size - self.position)
+        if length <= 0:
+            return 0
+        block_size = sigexport.files.IV_SIZE
+        first_block = self.position // block_size
+        last_block = (self.position + length - 1) // block_size
+        self.file.seek(first_block * block_size)
+        data = self.file.read((last_block - first_block + 2) * block_size)
+        iv, ciphertext = data[:block_size], data[block_size:]
+        decryptor = Cipher(algorithms.AES(self.cipher_key), modes.CBC(iv)).decryptor()
+        start = self.position % block_size
+        buffer[:length] = decryptor.update(ciphertext)[start : start + length]
+        self.position += length
+        return length
+
+    def close(self):
+        self.file.close()
+        super().close()
+
+
+class EncryptedAttachment(common.ResourceContent):
+    """
+    Attachment of version 2, which is encrypted. It's decrypted only while reading,
+    so it's written once, directly to the output folder.
+    Similar to "sigexport.files.decrypt_attachment()".
+    """
+
+    def __init__(self, attachment: dict, source_file: Path):
+        try:
+            keys = base64.b64decode(attachment["localKey"])
+        except KeyError as exc:
+            raise ValueError("No key in attachment") from exc
+        except Exception as exc:
+            raise ValueError(f"Cannot decode keys: {exc}") from exc
+        if len(keys) != sigexport.files.CIPHER_KEY_SIZE + sigexport.files.MAC_KEY_SIZE:
+            raise ValueError("Invalid keys length")
+        self.cipher_key = keys[: sigexport.files.CIPHER_KEY_SIZE]
+        self.source_file = source_file
+        self.size = int(attachment["size"])
+
+        ciphertext_size = (
+            source_file.stat().st_size - sigexport.files.IV_SIZE - sigexport.files.MAC_SIZE
+        )
+        if ciphertext_size < 0:
+            raise ValueError("Attachment data too short")
+        if ciphertext_size % sigexport.files.IV_SIZE != 0 or ciphertext_size < self.size:
+            raise ValueError("Invalid attachment data length")
+
+        # Verify the MAC and hash the plaintext in a single pass.
+        mac = hmac.new(keys[sigexport.files.CIPHER_KEY_SIZE :], digestmod=hashlib.sha256)
+        md5 = hashlib.md5()
+        with source_file.open("rb") as file_:
+            iv = file_.read(sigexport.files.IV_SIZE)
+            mac.update(iv)
+            decryptor = Cipher(algorithms.AES(self.cipher_key), modes.CBC(iv)).decryptor()
+            remaining_size = self.size
+            while ciphertext_size > 0:
+                chunk = file_.read(min(DECRYPTION_CHUNK_SIZE, ciphertext_size))
+                ciphertext_size -= len(chunk)
+                mac.update(chunk)
+                plaintext = decryptor.update(chunk)[:remaining_size]
+                md5.update(plaintext)
+                remaining_size -= len(plaintext)
+            if not hmac.compare_digest(mac.digest(), file_.read(sigexport.files.MAC_SIZE)):
+                raise ValueError("MAC mismatch")
+        self.md5 = md5.hexdigest()
+
+    def open(self) -> BinaryIO:
+        stream = DecryptedStream(self.source_file, self.cipher_key, self.size)
+        return cast(BinaryIO, io.BufferedReader(stream))
+
 
 class Converter(converter.BaseConverter):
     def __init__(self, config: common.Config):
         super().__init__(config)
         self.password = config.password
-        self.resource_folder = common.get_temp_folder()
+        # attachment name -> file to be used as resource
+        self.attachment_files: dict[str, Path] = {}
+        # attachment name -> encrypted attachment
+        self.attachment_contents: dict[str, EncryptedAttachment] = {}
+
+    def find_attachments(
+        self, source_folder: Path, key: str | None, convos: sigexport.models.Convos
+    ):
+        """
+        Find the attachments of all messages. Plain attachments are referenced in place.
+        Encrypted attachments are decrypted when they are written.
+        """
+        attachment_folder = source_folder / "attachments.noindex"
+
+        db = connect_database(source_folder, key)
+        cursor = db.cursor()
+        db_version = cursor.execute("PRAGMA user_version").fetchone()[0]
+
+        for messages in convos.values():
+            for message in messages:
+                if db_version >= 1360:
+                    message.attachments = sigexport.files.get_attachments_from_db(
+                        cursor, message.id
+                    )
+                elif getattr(message, "attachments", None) is None:
+                    message.attachments = []
+                if not message.attachments:
+                    continue
+
+                date = (
+                    dt.datetime.fromtimestamp(message.get_ts() / 1000)
+                    .isoformat(timespec="milliseconds")
+                    .replace(":", "-")
+                )
+                for index, attachment in enumerate(message.attachments):
+                    # The name is used by "sigexport.create.create_chats()".
+                    attachment["fileName"] = get_attachment_name(attachment, date, index)
+                    if attachment.get("path") is None:
+                        continue  # broken attachment
+                    source_file = attachment_folder / attachment["path"].replace("\\", "/")
+
+                    if int(attachment.get("version") or 0) < 2:
+                        self.attachment_files[attachment["fileName"]] = source_file
+                        continue
+                    try:
+                        self.attachment_contents[attachment["fileName"]] = EncryptedAttachment(
+                            attachment, source_file
+                        )
+                    except (OSError, ValueError) as exc:
+                        self.logger.warning(f'Failed to decrypt "{source_file}": {exc}')
+        db.close()
 
     @common.catch_all_exceptions
     def convert_note(self, title, messages: list[sigexport.models.Message]):
@@ -35,14 +243,31 @@ class Converter(converter.BaseConverter):
                 note_body.append(f"{message_prefix} {message.body}")
 
             for resource in message.attachments:
-                resource_path = self.resource_folder / title / resource.path
+                resource_path = self.attachment_files.get(resource.name)
+                resource_content = self.attachment_contents.get(resource.name)
                 resource_link = jimmy.md_lib.links.make_link(
-                    resource.name, str(resource_path), is_image=common.is_image(Path(resource.path))
+                    resource.name,
+                    str(resource_path or resource.path),
+                    is_image=common.is_image(Path(resource.path)),
                 )
                 note_body.append(resource_link)
 
-                if resource_path.exists():
-                    note_imf.resources.append(imf.Resource(resource_path, resource_link))
+                if resource_content is not None:
+                    note_imf.resources.append(
+                        imf.Resource(
+                            Path(resource.name),
+                            resource_link,
+                            resource.name,
+                            target_name=resource.name,
+                            content=resource_content,
+                        )
+                    )
+                elif resource_path is not None and resource_path.exists():
+                    note_imf.resources.append(
+                        imf.Resource(
+                            resource_path, resource_link, resource.name, target_name=resource.name
+                        )
+                    )
                 else:
                     # self.logger.debug(f"File '{resource_path}' doesn't exist. Ignoring.")
                     pass  # silently skip old files to don't pollute the log
@@ -56,10 +281,12 @@ class Converter(converter.BaseConverter):
 
     def convert(self, file_or_folder: Path):
         source_folder = file_or_folder.expanduser().resolve()
+        # Derive the key only once. It's needed for the messages and the attachments.
+        db_key = sigexport.crypto.get_key(source_folder, self.password)
         convos, contacts, _ = sigexport.data.fetch_data(
             source_folder,
             password=self.password,  # password for DB key
-            key=None,
+            key=db_key,
             chats="",  # all chats
             include_empty=False,
             include_disappearing=True,
@@ -67,9 +294,9 @@ class Converter(converter.BaseConverter):
             end_date=None,
         )
 
-        sigexport.files.copy_attachments(
-            source_folder, self.resource_folder, convos, contacts, password=self.password, key=None
-        )
+        # Don't use "sigexport.files.copy_attachments()". It copies all attachments
+        # to a temporary folder and they would be copied again by the writer.
+        self.find_attachments(source_folder, db_key, convos)
 
         chat_dict = sigexport.create.create_chats(convos, contacts)
 
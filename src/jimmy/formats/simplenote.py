@@ -22,6 +22,10 @@ def extract_tags_from_body(body: str) -> tuple[str, list[str]]:
 
 
 class Converter(converter.BaseConverter):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.read_archive_in_place = True
+
     @common.catch_all_exceptions
     def convert_note(self, note_simplenote):
         # title is the first line
@@ -2,6 +2,7 @@
 
 import copy
 import dataclasses
+import itertools
 import json
 from pathlib import Path
 from urllib.parse import urlparse
@@ -11,6 +12,9 @@ import jimmy.md_lib.convert
 import jimmy.md_lib.html_filter
 import jimmy.md_lib.links
 
+# Number of notes that are kept in memory at the same time.
+NOTE_BATCH_SIZE = 100
+
 
 @dataclasses.dataclass
 class Attachment:
@@ -25,12 +29,16 @@ class Attachment:
 class Converter(converter.BaseConverter):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.available_resources = []
+        self.read_archive_in_place = True
+        # indices for fast lookup
+        self.md5_resource_map: dict[str, Attachment] = {}
+        # The same ref can be used by multiple resources. Thus, map ref -> md5 -> resource.
+        self.ref_resources_map: dict[str, dict[str, Attachment]] = {}
+        self.notebook_id_map: dict[str, imf.Notebook] = {}
 
     def find_parent_notebook(self, parent_id: str) -> imf.Notebook:
-        for notebook in self.root_notebook.child_notebooks:
-            if notebook.original_id == parent_id:
-                return notebook
+        if (notebook := self.notebook_id_map.get(parent_id)) is not None:
+            return notebook
         self.logger.debug(f"Couldn't find parent notebook with id {parent_id}")
         return self.root_notebook
 
@@ -70,9 +78,7 @@ class Converter(converter.BaseConverter):
             else:
                 # resource
                 # Find resource file by "ref".
-                matched_resources = [
-                    res for res in self.available_resources if link.url in res.refs
-                ]
+                matched_resources = list(self.ref_resources_map.get(link.url, {}).values())
                 if len(matched_resources) != 1:
                     self.logger.debug(
                         "Found too less or too many resources: "
@@ -91,38 +97,47 @@ class Converter(converter.BaseConverter):
         for notebook_id in input_json["notebook"]:
             notebook = json.loads((self.root_path / notebook_id).read_text(encoding="utf-8"))
 
-            self.root_notebook.child_notebooks.append(
-                imf.Notebook(notebook["title"], original_id=notebook_id)
-            )
+            notebook_imf = imf.Notebook(notebook["title"], original_id=notebook_id)
+            self.root_notebook.child_notebooks.append(notebook_imf)
+            self.notebook_id_map.setdefault(notebook_id, notebook_imf)
 
     def map_resources_by_hash(self, note: dict) -> imf.Resources:
         resources: imf.Resources = []
         if note.get("attachment") is None:
             return resources
         for note_resource in note["attachment"].values():
-            # TODO: access directly by filename (e. g. "file_<md5>")
-            for file_resource in self.available_resources:
-                if note_resource["md5"] == file_resource.md5:
-                    if (ref := note_resource.get("ref")) is not None:
-                        # The same resource can be linked multiple times.
-                        file_resource.refs.append(ref)
-                        file_resource.titles.append(note_resource["name"])
-                    else:
-                        # The attachment is not referenced. Add it here.
-                        # Referenced attachments are added later.
-                        resources.append(
-                            imf.Resource(file_resource.filename, title=note_resource["name"])
-                        )
-                    break
+            if (file_resource := self.md5_resource_map.get(note_resource["md5"])) is None:
+                continue
+            if (ref := note_resource.get("ref")) is not None:
+                # The same resource can be linked multiple times.
+                file_resource.refs.append(ref)
+                file_resource.titles.append(note_resource["name"])
+                self.ref_resources_map.setdefault(ref, {})[file_resource.md5] = file_resource
+            else:
+                # The attachment is not referenced. Add it here.
+                # Referenced attachments are added later.
+                resources.append(imf.Resource(file_resource.filename, title=note_resource["name"]))
         return resources
 
     @common.catch_all_exceptions
-    def convert_note(self, note_id, note_id_title_map):
-        note = json.loads((self.root_path / note_id).read_text(encoding="utf-8"))
-
+    def convert_body(self, pending_note: tuple[str, dict]) -> str | None:
+        """Convert the note body to Markdown. Return None if the note is in the trash."""
+        _, note = pending_note
         if note["parent_id"].rsplit("_")[-1] == "#00000000":
             self.logger.debug(f'Ignoring note in trash "{note["title"]}"')
-            return
+            return None
+        if (content_html := note.get("content")) is None:
+            return ""
+        return jimmy.md_lib.convert.markup_to_markdown(
+            content_html,
+            custom_filter=[
+                jimmy.md_lib.html_filter.synology_note_station_fix_checklists,
+                jimmy.md_lib.html_filter.synology_note_station_fix_img_src,
+            ],
+        )
+
+    @common.catch_all_exceptions
+    def convert_note(self, note_id, note: dict, content_markdown: str, note_id_title_map):
         title = note["title"]
         self.logger.debug(f'Converting note "{title}" (ID: "{note_id}")')
 
@@ -130,14 +145,7 @@ class Converter(converter.BaseConverter):
         resources = self.map_resources_by_hash(note)
 
         note_links: imf.NoteLinks = []
-        if (content_html := note.get("content")) is not None:
-            content_markdown = jimmy.md_lib.convert.markup_to_markdown(
-                content_html,
-                custom_filter=[
-                    jimmy.md_lib.html_filter.synology_note_station_fix_checklists,
-                    jimmy.md_lib.html_filter.synology_note_station_fix_img_src,
-                ],
-            )
+        if note.get("content") is not None:
             # note title only needed for debug message
             body, resources_referenced, note_links = self.handle_markdown_links(
                 note["title"],
@@ -187,7 +195,8 @@ class Converter(converter.BaseConverter):
                     continue  # ignore thumbnails
                 # Don't use the actual hash: hashlib.md5(item.read_bytes()).hexdigest()
                 # It can change. So we need to take the hash from the filename.
-                self.available_resources.append(Attachment(item, item.stem.split("_")[-1]))
+                md5 = item.stem.split("_")[-1]
+                self.md5_resource_map.setdefault(md5, Attachment(item, md5))
 
         # for internal links, we need to store the note titles
         note_id_title_map = {}
@@ -195,5 +204,10 @@ class Converter(converter.BaseConverter):
             note = json.loads((self.root_path / note_id).read_text(encoding="utf-8"))
             note_id_title_map[note_id] = note["title"]
 
-        for note_id in input_json["note"]:
-            self.convert_note(note_id, note_id_title_map)
+        for note_ids in itertools.batched(input_json["note"], NOTE_BATCH_SIZE, strict=False):
+            notes = [
+                (note_id, json.loads((self.root_path / note_id).read_text(encoding="utf-8")))
+                for note_id in note_ids
+            ]
+            for (note_id, note), body in self.convert_bodies(self.convert_body, notes):
+                self.convert_note(note_id, note, body, note_id_title_map)
@@ -1,7 +1,7 @@
 """Convert Telegram chats to the intermediate format."""
 
-import json
 from pathlib import Path
+from typing import Any
 
 from jimmy import common, converter, intermediate_format as imf
 import jimmy.md_lib.links
@@ -44,12 +44,26 @@ class Converter(converter.BaseConverter):
 
         self.root_notebook.child_notes.append(note_imf)
 
+    def convert_chat(self, reader: common.JsonReader):
+        """Stream a chat or a complete export. Only one message is read at a time."""
+        chat: dict[str, Any] = {}
+        for key in reader.iter_object():
+            match key:
+                case "chats":
+                    self.logger.debug('Found "chats" key. Assuming a complete "DataExport".')
+                    for chats_key in reader.iter_object():
+                        if chats_key == "list":
+                            for _ in reader.iter_array(decode=False):
+                                self.convert_chat(reader)
+                case "id" | "name":
+                    chat[key] = reader.read_value()
+                case "messages":
+                    # "id" and "name" precede the messages in the export.
+                    chat["messages"] = messages = reader.iter_array()
+                    self.convert_note(chat)
+                    for _ in messages:
+                        pass  # skip the remaining messages if the conversion failed
+
     def convert(self, file_or_folder: Path):
-        input_json = json.loads((file_or_folder / "result.json").read_text(encoding="utf-8"))
-        if (chats := input_json.get("chats")) is not None:
-            self.logger.debug('Found "chats" key. Assuming that this is a complete "DataExport".')
-            for chat in chats["list"]:
-                self.convert_note(chat)
-        else:
-            self.logger.debug('No "chats" key. Assuming that this is a single "ChatExport".')
-            self.convert_note(input_json)
+        with (file_or_folder / "result.json").open(encoding="utf-8") as input_file:
+            self.convert_chat(common.JsonReader(input_file))
@@ -1,10 +1,12 @@
 """Convert TiddlyWiki notes to the intermediate format."""
 
+import base64
+from collections.abc import Container
 import datetime as dt
 from html.parser import HTMLParser
-import json
 import logging
 from pathlib import Path
+import re
 import string
 
 from jimmy import common, converter, intermediate_format as imf
@@ -14,6 +16,13 @@ import jimmy.md_lib.tiddlywiki
 
 LOGGER = logging.getLogger("jimmy")
 
+# PascalCase words with at least two upper case letters, like in "common.is_pascal_case()".
+# They can be surrounded by punctuation and are separated by spaces or newlines.
+PUNCTUATION = re.escape(string.punctuation)
+PASCAL_CASE_LINK_RE = re.compile(
+    rf"(?<![^ \n])([{PUNCTUATION}]*)((?:[A-Z][a-z]+){{2,}})(?=[{PUNCTUATION}]*(?![^ \n]))"
+)
+
 
 # https://developer.mozilla.org/en-US/docs/Glossary/Void_element
 HTML_VOID_ELEMENTS = (
@@ -303,37 +312,26 @@ def split_tags(tag_string: str) -> list[str]:
     return final_tags
 
 
-def count_upper_case_letters(word: str) -> int:
+def link_pascal_case_words(body: str, titles: Container[str]) -> tuple[str, list[str]]:
     """
-    >>> count_upper_case_letters("PascalCase")
-    2
-    >>> count_upper_case_letters("Pascalcase")
-    1
-    >>> count_upper_case_letters("")
-    0
+    Link the PascalCase words that match a note title.
+    Return the new body and the linked titles.
+
+    >>> link_pascal_case_words("(JavaScript). ~JavaScript", {"JavaScript"})
+    ('([JavaScript](tiddlywiki://JavaScript)). ~JavaScript', ['JavaScript'])
+    >>> link_pascal_case_words("Java JavaScript's NoTitle", {"Java", "NoTitle"})
+    ("Java JavaScript's [NoTitle](tiddlywiki://NoTitle)", ['NoTitle'])
     """
-    return sum(1 for character in word if character.isupper())
+    linked_titles: dict[str, None] = {}
 
+    def to_link(match: re.Match) -> str:
+        prefix, word = match.groups()
+        if "~" in prefix or word not in titles:
+            return match[0]  # escaped link or no title
+        linked_titles[word] = None
+        return f"{prefix}[{word}](tiddlywiki://{word})"
 
-def is_escaped_link(word: str) -> bool:
-    """
-    >>> is_escaped_link("JavaScript")
-    False
-    >>> is_escaped_link("JavaScript~")
-    False
-    >>> is_escaped_link("~JavaScript")
-    True
-    >>> is_escaped_link("(~JavaScript")
-    True
-    >>> is_escaped_link("~(JavaScript")
-    True
-    """
-    for character in word:
-        if character == "~":
-            return True
-        if character in string.ascii_letters:
-            return False
-    return False
+    return PASCAL_CASE_LINK_RE.sub(to_link, body), list(linked_titles)
 
 
 class Converter(converter.BaseConverter):
@@ -343,9 +341,6 @@ class Converter(converter.BaseConverter):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # we need a resource folder to avoid writing files to the source folder
-        self.resource_folder = common.get_temp_folder()
-
         self.pascalcase_title_note_id_map = {}
 
     @staticmethod
@@ -378,30 +373,9 @@ class Converter(converter.BaseConverter):
         I.e. single words like Camel are not linked.
         """
         for note in self.root_notebook.get_all_child_notes():
-            pascal_case_links = set()
-            new_note_body_lines = []
-            for line in note.body.split("\n"):
-                new_line = []
-                for word in line.split(" "):
-                    if is_escaped_link(word):
-                        new_line.append(word)
-                        continue  # escaped link
-                    word_no_punctuation = word.strip(string.punctuation)
-                    if (
-                        common.is_pascal_case(word_no_punctuation)
-                        and count_upper_case_letters(word_no_punctuation) > 1
-                        and word_no_punctuation in self.pascalcase_title_note_id_map
-                    ):
-                        pascal_case_links.add(word_no_punctuation)
-                        new_line.append(
-                            word.replace(
-                                word_no_punctuation,
-                                f"[{word_no_punctuation}](tiddlywiki://{word_no_punctuation})",
-                            )
-                        )
-                    else:
-                        new_line.append(word)
-                new_note_body_lines.append(" ".join(new_line))
+            note.body, pascal_case_links = link_pascal_case_words(
+                note.body, self.pascalcase_title_note_id_map
+            )
             for link in pascal_case_links:
                 note.note_links.append(
                     imf.NoteLink(
@@ -410,7 +384,6 @@ class Converter(converter.BaseConverter):
                         link,
                     )
                 )
-            note.body = "\n".join(new_note_body_lines)
 
     ############################################################
     # .json conversion
@@ -443,14 +416,16 @@ class Converter(converter.BaseConverter):
             if (text_base64 := tiddler.get("text")) is not None:
                 # Use the original filename if possible.
                 resource_title = tiddler.get("alt-text")
-                temp_filename = self.resource_folder / (
-                    common.unique_title() if resource_title is None else resource_title
-                )
-                temp_filename = common.write_base64(temp_filename, text_base64)
-                body = jimmy.md_lib.links.make_link(
-                    temp_filename.name, str(temp_filename), is_image=True
+                filename = Path(common.unique_title() if resource_title is None else resource_title)
+                body = jimmy.md_lib.links.make_link(filename.name, str(filename), is_image=True)
+                resources.append(
+                    imf.Resource(
+                        filename,
+                        body,
+                        resource_title,
+                        content=common.SpooledContent(base64.b64decode(text_base64)),
+                    )
                 )
-                resources.append(imf.Resource(temp_filename, body, resource_title))
             elif (source := tiddler.get("source")) is not None:
                 body = jimmy.md_lib.links.make_link(title, source, is_image=True)
             elif (uri := tiddler.get("_canonical_uri")) is not None:
@@ -484,8 +459,7 @@ class Converter(converter.BaseConverter):
         self.root_notebook.child_notes.append(note_imf)
 
     def convert_json(self, file_or_folder: Path):
-        input_json = json.loads(file_or_folder.read_text(encoding="utf-8"))
-        for tiddler in input_json:
+        for tiddler in common.iter_json_array(file_or_folder):
             self.convert_note_json(tiddler)
 
     ############################################################
@@ -1,5 +1,6 @@
 """Convert Turtl notes to the intermediate format."""
 
+import base64
 import json
 from pathlib import Path
 
@@ -8,11 +9,6 @@ import jimmy.md_lib.links
 
 
 class Converter(converter.BaseConverter):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        # we need a resource folder to avoid writing files to the source folder
-        self.resource_folder = common.get_temp_folder()
-
     def find_parent_notebook(self, space_id, board_id):
         # first level: space
         space = None
@@ -33,25 +29,6 @@ class Converter(converter.BaseConverter):
         self.logger.debug(f"Couldn't find board with id {board_id}")
         return self.root_notebook
 
-    def handle_markdown_links(self, body: str, path: Path) -> tuple[imf.Resources, imf.NoteLinks]:
-        # pylint: disable=duplicate-code
-        # TODO
-        note_links = []
-        resources = []
-        for link in jimmy.md_lib.links.get_markdown_links(body):
-            if link.is_web_link or link.is_mail_link:
-                continue  # keep the original links
-            resource_path = path / link.url
-            if resource_path.is_file():
-                if common.is_image(resource_path):
-                    # resource
-                    resources.append(imf.Resource(resource_path, str(link), link.text))
-                else:
-                    # TODO: this could be a resource, too. How to distinguish?
-                    # internal link
-                    note_links.append(imf.NoteLink(str(link), Path(link.url).stem, link.text))
-        return resources, note_links
-
     @common.catch_all_exceptions
     def convert_note(self, note: dict, file_map: dict):
         title = note["title"]
@@ -84,17 +61,20 @@ class Converter(converter.BaseConverter):
         # I. e. if the type is "file". Check always.
         # It seems like a note can have maximum one file attached.
         if (file_data := file_map.get(note["id"])) is not None:
-            filename = self.resource_folder / note["file"]["name"]
-            filename = common.write_base64(filename, file_data)
+            filename = Path(note["file"]["name"])
             file_md = jimmy.md_lib.links.make_link(note["file"]["name"], str(filename))
             note_imf.body += f"\n\n{file_md}"
+            note_imf.resources.append(
+                imf.Resource(
+                    filename,
+                    file_md,
+                    note["file"]["name"],
+                    content=common.SpooledContent(base64.b64decode(file_data)),
+                )
+            )
         # else:
         #     self.logger.debug(f"Couldn't find file with id {note["id"]}")
 
-        resources, note_links = self.handle_markdown_links(note_imf.body, self.resource_folder)
-        note_imf.resources = resources
-        note_imf.note_links = note_links
-
         parent_notebook = self.find_parent_notebook(note["space_id"], note["board_id"])
         parent_notebook.child_notes.append(note_imf)
 
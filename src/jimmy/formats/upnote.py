@@ -1,6 +1,10 @@
 """Convert UpNote notes to the intermediate format."""
 
+from collections.abc import Iterator
+import gzip
+import itertools
 import json
+import logging
 from pathlib import Path
 import urllib.parse
 
@@ -9,6 +13,44 @@ import jimmy.md_lib.convert
 import jimmy.md_lib.html_filter
 import jimmy.md_lib.links
 
+LOGGER = logging.getLogger("jimmy")
+# Number of notes that are kept in memory at the same time.
+NOTE_BATCH_SIZE = 100
+
+
+def iter_backup(backup_file: Path) -> Iterator[dict]:
+    """Stream the items of a backup. Each line, except the version, is a JSON object."""
+    with gzip.open(backup_file, "rt", encoding="utf-8") as backup:
+        next(backup, None)  # skip the version
+        for line in backup:
+            if line.strip():
+                yield json.loads(line)
+
+
+@common.catch_all_exceptions
+def convert_body(note_upnote: dict) -> str | None:
+    """Convert the note body to Markdown. Return None if the note is skipped."""
+    if is_skipped(note_upnote):
+        return None
+    return jimmy.md_lib.convert.markup_to_markdown(
+        note_upnote["data"]["html"],
+        custom_filter=[
+            jimmy.md_lib.html_filter.upnote_add_formula,
+            jimmy.md_lib.html_filter.upnote_add_highlight,
+            jimmy.md_lib.html_filter.upnote_streamline_checklists,
+        ],
+    )
+
+
+def is_skipped(note_upnote: dict) -> bool:
+    if note_upnote["data"].get("trashed", False) or note_upnote["data"].get("deleted", False):
+        LOGGER.debug(f'Skipping trashed or deleted note "{note_upnote["data"]["title"]}".')
+        return True
+    if note_upnote["data"].get("isTemplate", False):
+        LOGGER.debug(f'Skipping template "{note_upnote["data"]["title"]}".')
+        return True
+    return False
+
 
 class Converter(converter.BaseConverter):
     def __init__(self, *args, **kwargs):
@@ -47,18 +89,10 @@ class Converter(converter.BaseConverter):
         return note_body, resources, note_links, tags
 
     @common.catch_all_exceptions
-    def convert_note(self, note_upnote: dict, resource_path: Path):
+    def convert_note(self, note_upnote: dict, note_body: str, resource_path: Path):
         title = note_upnote["data"]["title"]
         self.logger.debug(f'Converting note "{title}"')
 
-        if note_upnote["data"].get("trashed", False) or note_upnote["data"].get("deleted", False):
-            self.logger.debug("Skipping trashed or deleted note.")
-            return
-
-        if note_upnote["data"].get("isTemplate", False):
-            self.logger.debug("Skipping template.")
-            return
-
         id_ = note_upnote["data"]["id"]
         note_imf = imf.Note(
             title,
@@ -68,15 +102,6 @@ class Converter(converter.BaseConverter):
             source_application=self.format,
         )
 
-        note_body = jimmy.md_lib.convert.markup_to_markdown(
-            note_upnote["data"]["html"],
-            custom_filter=[
-                jimmy.md_lib.html_filter.upnote_add_formula,
-                jimmy.md_lib.html_filter.upnote_add_highlight,
-                jimmy.md_lib.html_filter.upnote_streamline_checklists,
-            ],
-        )
-
         # TODO: Are there only inline tags?
         note_imf.body, note_imf.resources, note_imf.note_links, note_imf.tags = (
             self.handle_markdown_links(note_body, resource_path)
@@ -110,16 +135,13 @@ class Converter(converter.BaseConverter):
                 "Resources won't be converted."
             )
 
-        backup_file = common.extract_gzip(backup_file)
-        backup_text = backup_file.read_text(encoding="utf-8")
-        backup_lines = backup_text.split("\n")
-        if backup_lines[0] != "version:2":
-            self.logger.warning(f"Unsupported version {backup_lines[0]}")
-
-        backup_dicts = [json.loads(backup_line) for backup_line in backup_lines[1:]]
+        with gzip.open(backup_file, "rt", encoding="utf-8") as backup:
+            if (version := backup.readline().rstrip("\n")) != "version:2":
+                self.logger.warning(f"Unsupported version {version}")
 
+        # The backup is streamed twice. Only the metadata is kept in memory.
         # first iteration parse all notebooks and tags
-        for backup_dict in backup_dicts:
+        for backup_dict in iter_backup(backup_file):
             match backup_dict["type"]:
                 case "files":
                     # example ID: '2e80e4b0-f9e4-49f8-a6ac-4c3051f208fe__png'
@@ -152,21 +174,28 @@ class Converter(converter.BaseConverter):
                     self.tag_id_map[id_] = imf.Tag(backup_dict["data"]["title"])
 
         # second iteration create hierarchy including notes and notebooks
-        for backup_dict in backup_dicts:
-            match backup_dict["type"]:
-                case "notebooks":
-                    id_ = backup_dict["data"]["id"]
-                    if (parent_notebook_id := backup_dict["data"]["parent"]) in ("", None):
-                        parent_notebook = self.root_notebook
-                    else:
-                        parent_notebook = self.notebook_id_map[parent_notebook_id]
-                    parent_notebook.child_notebooks.append(self.notebook_id_map[id_])
-                case "filters" | "files" | "lists" | "organizers" | "tags":
-                    pass  # handled already or unused
-                case "notes":
-                    self.convert_note(backup_dict, resource_folder)
-                case _:
-                    self.logger.debug(f'Skipping unexpected key "{backup_dict["type"]}".')
+        for backup_batch in itertools.batched(
+            iter_backup(backup_file), NOTE_BATCH_SIZE, strict=False
+        ):
+            notes = []
+            for backup_dict in backup_batch:
+                match backup_dict["type"]:
+                    case "notebooks":
+                        id_ = backup_dict["data"]["id"]
+                        if (parent_notebook_id := backup_dict["data"]["parent"]) in ("", None):
+                            parent_notebook = self.root_notebook
+                        else:
+                            parent_notebook = self.notebook_id_map[parent_notebook_id]
+                        parent_notebook.child_notebooks.append(self.notebook_id_map[id_])
+                    case "filters" | "files" | "lists" | "organizers" | "tags":
+                        pass  # handled already or unused
+                    case "notes":
+                        notes.append(backup_dict)
+                    case _:
+                        self.logger.debug(f'Skipping unexpected key "{backup_dict["type"]}".')
+
+            for note_upnote, note_body in self.convert_bodies(convert_body, notes):
+                self.convert_note(note_upnote, note_body, resource_folder)
 
     def convert(self, file_or_folder: Path):
         backup_files = list(file_or_folder.rglob("*.upnx"))
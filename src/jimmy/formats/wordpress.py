@@ -1,11 +1,19 @@
 """Convert a Wordpress XML export to the intermediate format."""
 
+from collections.abc import Iterator
+import functools
+import itertools
+import logging
 from pathlib import Path
 import xml.etree.ElementTree as ET  # noqa: N817
 
 from jimmy import common, converter, intermediate_format as imf
 import jimmy.md_lib.convert
 
+LOGGER = logging.getLogger("jimmy")
+# Number of items that are kept in memory at the same time.
+ITEM_BATCH_SIZE = 100
+
 
 def get_text(element, default: str | None = None) -> str | None:
     if element is not None and element.text is not None:
@@ -13,20 +21,58 @@ def get_text(element, default: str | None = None) -> str | None:
     return default
 
 
+def is_skipped(item, namespaces) -> bool:
+    if (post_type := get_text(item.find("wp:post_type", namespaces))) in (
+        "nav_menu_item",
+        "wp_global_styles",
+        "wp_navigation",
+    ):
+        LOGGER.debug(f'Skipping {post_type} "{get_text(item.find("title"))}"')
+        return True
+    return False
+
+
+@common.catch_all_exceptions
+def convert_body(pending_item: tuple[ET.Element, imf.Notebook], namespaces) -> str:
+    item, _ = pending_item
+    body = ""
+    content = get_text(item.find("content:encoded", namespaces))
+    if content is not None:
+        body = jimmy.md_lib.convert.markup_to_markdown(content)
+    for attachment in item.findall("wp:attachment_url", namespaces):
+        attachment_text = get_text(attachment)
+        if attachment_text is None:
+            continue
+        if attachment_text.lower().endswith((".gif", ".png", ".jpg", ".jpeg", ".webp")):
+            attchment_md = f"![]({attachment_text})\n"
+        else:
+            attchment_md = f"<{attachment_text}>\n"
+        body += attchment_md
+
+    if comments := item.findall("wp:comment", namespaces):
+        comments_md = ["", "", "## Comments"]
+        for comment in comments:
+            comment_author = get_text(
+                comment.find("wp:comment_author", namespaces),
+                default="Unknown",
+            )
+            comment_content = get_text(comment.find("wp:comment_content", namespaces))
+            if comment_content is not None:
+                comment_content_md = jimmy.md_lib.convert.markup_to_markdown(
+                    comment_content, standalone=False
+                )
+                comments_md.extend(["", f"**{comment_author}**: {comment_content_md}"])
+        body += "\n".join(comments_md)
+    return body
+
+
 class Converter(converter.BaseConverter):
     @common.catch_all_exceptions
-    def convert_note(self, item, parent_notebook: imf.Notebook, namespaces):
+    def convert_note(self, item, body: str, parent_notebook: imf.Notebook, namespaces):
         title = get_text(item.find("title"), default=common.unique_title())
-        if (post_type := get_text(item.find("wp:post_type", namespaces))) in (
-            "nav_menu_item",
-            "wp_global_styles",
-            "wp_navigation",
-        ):
-            self.logger.debug(f'Skipping {post_type} "{title}"')
-            return
         self.logger.debug(f'Converting note "{title}"')
         assert title is not None
-        note_imf = imf.Note(title)
+        note_imf = imf.Note(title, body)
 
         # TODO: note links
         # TODO: hierarchy: post_id - post_parent
@@ -53,52 +99,45 @@ class Converter(converter.BaseConverter):
         except TypeError, ValueError:
             self.logger.debug("Failed to parse date.")
 
-        content = get_text(item.find("content:encoded", namespaces))
-        if content is not None:
-            note_imf.body = jimmy.md_lib.convert.markup_to_markdown(content)
-        for attachment in item.findall("wp:attachment_url", namespaces):
-            attachment_text = get_text(attachment)
-            if attachment_text is None:
-                continue
-            if attachment_text.lower().endswith((".gif", ".png", ".jpg", ".jpeg", ".webp")):
-                attchment_md = f"![]({attachment_text})\n"
-            else:
-                attchment_md = f"<{attachment_text}>\n"
-            note_imf.body += attchment_md
-
-        if comments := item.findall("wp:comment", namespaces):
-            comments_md = ["", "", "## Comments"]
-            for comment in comments:
-                comment_author = get_text(
-                    comment.find("wp:comment_author", namespaces),
-                    default="Unknown",
-                )
-                comment_content = get_text(comment.find("wp:comment_content", namespaces))
-                if comment_content is not None:
-                    comment_content_md = jimmy.md_lib.convert.markup_to_markdown(
-                        comment_content, standalone=False
-                    )
-                    comments_md.extend(["", f"**{comment_author}**: {comment_content_md}"])
-            note_imf.body += "\n".join(comments_md)
-
         parent_notebook.child_notes.append(note_imf)
 
+    def add_notebook(self, title: str) -> imf.Notebook:
+        self.logger.debug(f'Converting notebook "{title}"')
+        notebook = imf.Notebook(title)
+        self.root_notebook.child_notebooks.append(notebook)
+        return notebook
+
+    def iter_items(
+        self, file_: Path, namespaces: dict[str, str]
+    ) -> Iterator[tuple[ET.Element, imf.Notebook]]:
+        """Stream the items to handle large exports. The notebooks are created on the fly."""
+        # The namespaces are declared at the root and available before any item.
+        channel_notebook_map: dict[ET.Element, imf.Notebook] = {}
+        for element, channel in common.iter_xml_elements(file_, depth=2, namespaces=namespaces):
+            if channel.tag != "channel":
+                continue
+            match element.tag:
+                case "title":
+                    if channel not in channel_notebook_map:
+                        channel_notebook_map[channel] = self.add_notebook(
+                            element.text or common.unique_title()
+                        )
+                case "item":
+                    if (parent_notebook := channel_notebook_map.get(channel)) is None:
+                        # The title is usually the first element of the channel.
+                        parent_notebook = channel_notebook_map[channel] = self.add_notebook(
+                            common.unique_title()
+                        )
+                    if not is_skipped(element, namespaces):
+                        yield element, parent_notebook
+
     @common.catch_all_exceptions
     def convert(self, file_or_folder: Path):
-        # first pass: parse namespaces
-        # TODO: move to common
-        namespaces = {
-            node[0]: node[1] for _, node in ET.iterparse(file_or_folder, events=["start-ns"])
-        }
-
-        # second pass: actual conversion
-        root_node = ET.parse(file_or_folder).getroot()
-        for channel in root_node.findall("channel"):
-            title = get_text(channel.find("title"), default=common.unique_title())
-            assert title is not None
-            self.logger.debug(f'Converting notebook "{title}"')
-            parent_notebook = imf.Notebook(title)
-            self.root_notebook.child_notebooks.append(parent_notebook)
-
-            for item in channel.findall("item"):
-                self.convert_note(item, parent_notebook, namespaces)
+        namespaces: dict[str, str] = {}
+        for item_batch in itertools.batched(
+            self.iter_items(file_or_folder, namespaces), ITEM_BATCH_SIZE, strict=False
+        ):
+            for (item, parent_notebook), body in self.convert_bodies(
+                functools.partial(convert_body, namespaces=namespaces), item_batch
+            ):
+                self.convert_note(item, body, parent_notebook, namespaces)
@@ -126,11 +126,15 @@ class Converter(converter.BaseConverter):
             )
 
         tag_id_name_map = {}
-        root_node = ET.parse(self.root_path / "keywordFile.xml").getroot()
-        for keyword in root_node.findall("entry"):
-            if (tag_id := keyword.attrib.get("f")) is not None:
+        for keyword, _ in common.iter_xml_elements(self.root_path / "keywordFile.xml"):
+            if keyword.tag == "entry" and (tag_id := keyword.attrib.get("f")) is not None:
                 tag_id_name_map[tag_id] = keyword.text
 
-        root_node = ET.parse(self.root_path / "zknFile.xml").getroot()
-        for id_, zettel in enumerate(root_node.findall("zettel"), start=1):
+        # Stream the notes. They are numbered by their position.
+        zettels = (
+            zettel
+            for zettel, _ in common.iter_xml_elements(self.root_path / "zknFile.xml")
+            if zettel.tag == "zettel"
+        )
+        for id_, zettel in enumerate(zettels, start=1):
             self.convert_note(id_, zettel, file_or_folder, tag_id_name_map)
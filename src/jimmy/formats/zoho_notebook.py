@@ -12,7 +12,7 @@ import jimmy.md_lib.links
 
 class Converter(converter.BaseConverter):
     def prepare_input(self, input_: Path) -> Path:
-        unzipped_input = common.extract_zip(input_)
+        unzipped_input = common.extract_zip(input_, jobs=self.jobs)
         # There is always one subfolder that contains all data.
         return common.get_single_child_folder(unzipped_input)
 
@@ -71,7 +71,7 @@ class Converter(converter.BaseConverter):
 
         # convert the note body to Markdown
         if soup.body is not None:
-            note_imf.body = jimmy.md_lib.convert.markup_to_markdown(str(soup), pwd=file_.parent)
+            note_imf.body = jimmy.md_lib.convert.markup_to_markdown(soup, pwd=file_.parent)
 
             # resources and internal links
             note_imf.resources, note_imf.note_links = self.handle_markdown_links(note_imf.body)
@@ -105,6 +105,10 @@ class Resource:
     title: str | None = None
     # Specify a `target_name` if the final resource name differs from `filename`.
     target_name: str | None = None
+    # Content of resources that are embedded in the notes, like base64 encoded images.
+    # It gets written only once, directly to the output folder. The `filename`
+    # doesn't need to exist in this case. It's only used to determine the name.
+    content: common.ResourceContent | None = dataclasses.field(default=None, repr=False)
 
     # internal data
     is_image: bool = dataclasses.field(init=False)
@@ -116,9 +120,9 @@ class Resource:
         self.filename = self.filename.expanduser()
         # We can't simply match by extension, because sometimes the files/images
         # are stored as binary blob without extension.
-        self.is_image = common.is_image(self.filename)
+        self.is_image = common.is_image(self.filename, self.content)
         # md5 checksum for detecting duplicated resources
-        self.md5 = common.md5_hash(self.filename)
+        self.md5 = common.md5_hash(self.filename) if self.content is None else self.content.md5
 
     def __eq__(self, other: object) -> bool:
         """Equality based on the md5 hash."""
@@ -125,6 +125,28 @@ def main():
         type=int,
         help="Experimental - Maximum filename length.",
     )
+    parser_cli.add_argument(
+        "--jobs",
+        default=1,
+        type=int,
+        help="Experimental - Number of parallel jobs. Supported only by some formats.",
+    )
+    parser_cli.add_argument(
+        "--max-pdf-pages",
+        type=int,
+        help="Experimental - Maximum number of pages to convert per PDF document.",
+    )
+    parser_cli.add_argument(
+        "--scratch-dir",
+        type=Path,
+        help="Folder for temporary files, like extracted archives. Defaults to the system's "
+        "temporary folder.",
+    )
+    parser_cli.add_argument(
+        "--max-scratch-size",
+        type=int,
+        help="Maximum size of the temporary files in MiB. The conversion is aborted if exceeded.",
+    )
     parser_cli.add_argument(
         "--print-tree",
         action="store_true",
@@ -110,6 +110,21 @@ def get_pandoc_version() -> str:
 
 
 def run_conversion(config) -> tuple[common.Stats, int]:
+    max_scratch_size = (
+        None if config.max_scratch_size is None else config.max_scratch_size * 1024**2
+    )
+    common.SCRATCH_SPACE.configure(config.scratch_dir, max_scratch_size)
+    try:
+        return convert_and_write(config)
+    except common.ScratchSpaceExceededError as exc:
+        LOGGER.error(exc)
+        return common.Stats(), len(config.input)
+    finally:
+        common.close_archives()
+        common.SCRATCH_SPACE.cleanup()
+
+
+def convert_and_write(config) -> tuple[common.Stats, int]:
     LOGGER.info(f"Jimmy {variables.VERSION} (Pandoc {get_pandoc_version()})")
     LOGGER.debug(f"Using pandoc from: {shutil.which('pandoc')}")
     LOGGER.debug(f"{config=}")
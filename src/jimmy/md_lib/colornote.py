@@ -4,6 +4,11 @@ import re
 
 import pyparsing as pp
 
+import jimmy.md_lib.common
+
+# Prevent spaces, tabs and newlines from being stripped.
+pp.ParserElement.set_default_whitespace_chars("")
+
 list_re = re.compile(r"^(\[[ V]\] )", re.MULTILINE)
 
 
@@ -16,6 +21,9 @@ def list_():
     return pp.Regex(list_re, as_group_list=True).set_parse_action(to_md)
 
 
+colornote_markup = jimmy.md_lib.common.plain_text("[") | list_()
+
+
 def colornote_to_md(body: str) -> str:
     r"""
     Main ColorNote markup to Markdown conversion function.
@@ -25,5 +33,4 @@ def colornote_to_md(body: str) -> str:
     >>> colornote_to_md("[ ] Item 1\n[ ] Item 2\n[ ] Item 3")
     '- [ ] Item 1\n- [ ] Item 2\n- [ ] Item 3'
     """
-    markup = list_()
-    return markup.transform_string(body)
+    return colornote_markup.transform_string(body)
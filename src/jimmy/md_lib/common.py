@@ -2,6 +2,8 @@
 
 import re
 
+import pyparsing as pp
+
 # https://en.wikipedia.org/wiki/List_of_URI_schemes
 web_schemes = [
     "file",
@@ -23,3 +25,15 @@ web_schemes = [
 NEG_LOOKBEHINDS = "".join(f"(?<!{scheme}:)" for scheme in web_schemes)
 double_slash_re = re.compile(rf"{NEG_LOOKBEHINDS}\/\/(.*?){NEG_LOOKBEHINDS}\/\/")
 horizontal_line_re = re.compile(r"^-{3,}$", re.MULTILINE)
+
+
+def plain_text(markup_characters: str) -> pp.ParserElement:
+    r"""
+    Match text that can't contain any markup, because markup starts only
+    at one of the given characters. Put it first in the alternatives of a grammar.
+    Plain text is consumed at once instead of trying all elements at every position.
+
+    >>> plain_text("[*").search_string("abc [x] *y*").as_list()
+    [['abc '], ['x] '], ['y']]
+    """
+    return pp.Regex(f"[^{re.escape(markup_characters)}]+").leave_whitespace()
@@ -1,11 +1,14 @@
 """Helper functions to convert between formats."""
 
+import glob
 import logging
 from pathlib import Path
+import tempfile
 
 from bs4 import BeautifulSoup
 import pypandoc
 
+from jimmy import common
 import jimmy.md_lib.html_filter
 
 LOGGER = logging.getLogger("jimmy")
@@ -70,9 +73,13 @@ PANDOC_OUTPUT_FORMAT = (
 # fmt:on
 
 
-def html_to_markdown(text_html: bytes | str, custom_filter: list | None = None):
+def html_to_markdown(text_html: bytes | str | BeautifulSoup, custom_filter: list | None = None):
     # some needed preprocessing
-    soup = BeautifulSoup(text_html, "html.parser")
+    # An already parsed soup is filtered in place. This avoids parsing the HTML twice.
+    if isinstance(text_html, BeautifulSoup):
+        soup = text_html
+    else:
+        soup = BeautifulSoup(text_html, "html.parser")
     if custom_filter is not None:
         for filter_ in custom_filter:
             filter_(soup)
@@ -114,12 +121,50 @@ def html_to_markdown(text_html: bytes | str, custom_filter: list | None = None):
     return text_md.strip()
 
 
+def get_reader_args(
+    resource_folder: Path, standalone: bool = True, extra_args: list | None = None
+) -> list:
+    """
+    Get the pandoc arguments to read markup as HTML.
+
+    >>> get_reader_args(Path("media"), standalone=False)
+    ['--extract-media=media', '--wrap=preserve', '--mathml']
+    """
+    if extra_args is None:
+        extra_args = []
+    extra_args.extend(
+        [
+            # somehow the temp folder is needed to create the resources properly
+            f"--extract-media={resource_folder}",
+            # don't create artificial line breaks
+            "--wrap=preserve",
+            # mathml seems cover the widest range of formulas
+            # https://pandoc.org/MANUAL.html#math-rendering-in-html
+            "--mathml",
+        ]
+    )
+    if standalone:
+        extra_args.append("--standalone")
+    return extra_args
+
+
+def new_media_folder(resource_folder: Path | None, prefix: str = "") -> Path:
+    """
+    Create a folder for the media files of a single document. Media files of
+    different documents often have the same name, like "media/image1.png".
+    Don't let them overwrite each other.
+    """
+    if resource_folder is None:
+        resource_folder = common.SCRATCH_SPACE.folder
+    return Path(tempfile.mkdtemp(prefix=prefix, dir=resource_folder))
+
+
 def markup_to_markdown(
     # pylint: disable=too-many-arguments,too-many-positional-arguments
-    text: bytes | str,
+    text: bytes | str | BeautifulSoup,
     pwd: Path | None = None,  # input
     format_: str = "html",
-    resource_folder: Path = Path("tmp_media"),  # output
+    resource_folder: Path | None = None,  # output
     standalone: bool = True,
     custom_filter: list | None = None,
     extra_args: list | None = None,
@@ -128,21 +173,7 @@ def markup_to_markdown(
     if format_.startswith("html"):
         text_html = text
     else:
-        if extra_args is None:
-            extra_args = []
-        extra_args.extend(
-            [
-                # somehow the temp folder is needed to create the resources properly
-                f"--extract-media={resource_folder}",
-                # don't create artificial line breaks
-                "--wrap=preserve",
-                # mathml seems cover the widest range of formulas
-                # https://pandoc.org/MANUAL.html#math-rendering-in-html
-                "--mathml",
-            ]
-        )
-        if standalone:
-            extra_args.append("--standalone")
+        media_folder = new_media_folder(resource_folder)
         # reader: x -> HTML
         text_html = pypandoc.convert_text(
             text,
@@ -150,13 +181,41 @@ def markup_to_markdown(
             format=format_,
             # Don't use sandbox to preserve linked files, like in asciidoc.
             # sandbox=True,
-            extra_args=extra_args,
+            extra_args=get_reader_args(media_folder, standalone, extra_args),
             # Resource path didn't work. Use pwd instead.
             # https://pandoc.org/MANUAL.html#reader-options
             # separator = ";" if platform.system().lower() == "windows" else ":"
             # extra_args.append(f"--resource-path={resource_path}")
             cworkdir=pwd,
         )
+        common.SCRATCH_SPACE.add(media_folder)
+
+    # HTML filter: HTML -> filter -> HTML
+    # writer: HTML -> Markdown
+    return html_to_markdown(text_html, custom_filter)
+
+
+def markup_file_to_markdown(
+    file_: Path,
+    format_: str,
+    resource_folder: Path | None = None,  # output
+    custom_filter: list | None = None,
+) -> str:
+    """
+    Convert a markup file to Markdown. Pandoc reads the file directly. This is
+    preferred for big binary formats, like docx, to avoid copying them in memory.
+    """
+    media_folder = new_media_folder(resource_folder, prefix=f"{file_.stem}_")
+    # reader: x -> HTML
+    text_html = pypandoc.convert_file(
+        # pypandoc globs the path. Escape it to be safe.
+        glob.escape(str(file_.absolute())),
+        INTERMEDIATE_FORMAT,
+        format=format_,
+        extra_args=get_reader_args(media_folder),
+        cworkdir=file_.parent,
+    )
+    common.SCRATCH_SPACE.add(media_folder)
 
     # HTML filter: HTML -> filter -> HTML
     # writer: HTML -> Markdown
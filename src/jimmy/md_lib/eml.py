@@ -22,7 +22,7 @@ def decode_payload(part) -> str:
         return content.decode("utf-8", errors="ignore")
 
 
-def handle_part(part, attachment_folder: Path) -> tuple[list[str], imf.Resources]:
+def handle_part(part) -> tuple[list[str], imf.Resources]:
     mime = part.get_content_type()
     if mime == "text/html":
         return [
@@ -37,17 +37,18 @@ def handle_part(part, attachment_folder: Path) -> tuple[list[str], imf.Resources
             id_ = f"[cid:{id_[1:-1]}]"
         # Use the original filename if possible.
         resource_name = part.get_filename(common.unique_title())
-        unique_resource_path = attachment_folder / resource_name
-        content = part.get_payload(decode=True)
-        unique_resource_path = common.get_unique_path(unique_resource_path, content)
-        unique_resource_path.write_bytes(content)
-        resource = imf.Resource(unique_resource_path, original_text=id_, title=resource_name)
+        resource = imf.Resource(
+            Path(resource_name),
+            original_text=id_,
+            title=resource_name,
+            content=common.SpooledContent(part.get_payload(decode=True)),
+        )
         return [], [resource]
     LOGGER.debug(f"Unhandled mime type: {mime}")
     return [], []
 
 
-def parse_message(message, attachment_folder: Path) -> tuple[list[str], imf.Resources]:
+def parse_message(message) -> tuple[list[str], imf.Resources]:
     body = []
     resources = []
     if message.is_multipart():
@@ -57,7 +58,7 @@ def parse_message(message, attachment_folder: Path) -> tuple[list[str], imf.Reso
             # choose the best payload: text is easy to process
             best_payload = message.get_body(preferencelist=("plain", "html"))
             if best_payload is not None:
-                part_body, part_resources = handle_part(best_payload, attachment_folder)
+                part_body, part_resources = handle_part(best_payload)
                 body.extend(part_body)
                 resources.extend(part_resources)
             else:
@@ -65,17 +66,17 @@ def parse_message(message, attachment_folder: Path) -> tuple[list[str], imf.Reso
         else:
             # iterate over all available payloads
             for payload in payloads:
-                part_body, part_resources = parse_message(payload, attachment_folder)
+                part_body, part_resources = parse_message(payload)
                 body.extend(part_body)
                 resources.extend(part_resources)
     else:
-        part_body, part_resources = handle_part(message, attachment_folder)
+        part_body, part_resources = handle_part(message)
         body.extend(part_body)
         resources.extend(part_resources)
     return body, resources
 
 
-def eml_to_note(file_: Path, attachment_folder: Path) -> imf.Note:
+def eml_to_note(file_: Path) -> imf.Note:
     # decode the header by using the default policy
     # https://stackoverflow.com/a/55210089/7410886
     message = email.message_from_bytes(
@@ -108,7 +109,7 @@ def eml_to_note(file_: Path, attachment_folder: Path) -> imf.Note:
     note_imf.created = date
     note_imf.updated = date
 
-    body, resources = parse_message(message, attachment_folder)
+    body, resources = parse_message(message)
     note_imf.body = "\n".join(body)
     note_imf.resources = resources
 
@@ -237,6 +237,7 @@ def get_markdown_links(text: str) -> list[MarkdownLink]:
     # doctest has too long lines
     r"""
     Get standard Markdown links and wikilinks.
+    This isn't thread-safe, since all calls share the same Markdown parser.
 
     >>> import logging
     >>> logging.getLogger().setLevel("INFO")
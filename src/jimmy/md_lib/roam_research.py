@@ -1,10 +1,30 @@
 """Convert Roam Research to Markdown."""
 
+import contextvars
 import re
 
 import pyparsing as pp
 
+import jimmy.md_lib.common
+import jimmy.md_lib.links
+
 any_link_re = re.compile(r"{{\[\[\S+\]\]: (\S+)}}")
+# Link texts can contain balanced brackets up to two levels deep, like "[a [[b]] c]".
+LINK_TEXT_RE = r"(?:[^\[\]\n]|\[(?:[^\[\]\n]|\[[^\[\]\n]*\])*\])*"
+md_link_to_block_re = re.compile(rf"\[({LINK_TEXT_RE})\]\(\(\((.*?)\)\)\)")
+md_link_to_page_re = re.compile(rf"\[({LINK_TEXT_RE})\]\(\[\[(.*?)\]\]\)")
+
+# The links to pages and blocks are collected while converting.
+# This way, the Markdown doesn't need to be parsed again.
+LINKS: contextvars.ContextVar[list[jimmy.md_lib.links.MarkdownLink]] = contextvars.ContextVar(
+    "LINKS"
+)
+
+
+def add_link(text: str, url: str) -> str:
+    link = jimmy.md_lib.links.MarkdownLink(text, url)
+    LINKS.get().append(link)
+    return str(link)
 
 
 roam_markup = pp.Forward()
@@ -55,13 +75,26 @@ def block_link():
     def to_md(tokens):
         title = tokens[0]
         if is_block_id(title):
-            return f"[{title}](roam-block://{title})"
+            return add_link(title, f"roam-block://{title}")
         return "((" + title + "))"
 
     return pp.QuotedString("((", end_quote_char="))").set_parse_action(to_md)
 
 
+def md_link_to_block():
+    def to_md(tokens):
+        text, title = tokens[0]
+        text = roam_markup.transform_string(text)
+        if is_block_id(title):
+            return add_link(text, f"roam-block://{title}")
+        return f"[{text}]((({title})))"
+
+    return pp.Regex(md_link_to_block_re, as_group_list=True).set_parse_action(to_md)
+
+
 def block_link_in_md_link():
+    # Fallback for link texts with unbalanced brackets. They aren't valid Markdown links,
+    # so they aren't collected.
     def to_md(tokens):
         title = tokens[0]
         if is_block_id(title):
@@ -74,7 +107,7 @@ def block_link_in_md_link():
 def embedded_block():
     def to_md(tokens):
         title = tokens[0]
-        return f"[{title}](roam-block://{title})"
+        return add_link(title, f"roam-block://{title}")
 
     return pp.QuotedString("{{[[embed]]: ((", end_quote_char="))}}").set_parse_action(to_md)
 
@@ -82,12 +115,22 @@ def embedded_block():
 def page_link():
     def to_md(tokens):
         title = tokens[0]
-        return f"[{title}](roam-page://{title})"
+        return add_link(title, f"roam-page://{title}")
 
     return pp.QuotedString("[[", end_quote_char="]]").set_parse_action(to_md)
 
 
+def md_link_to_page():
+    def to_md(tokens):
+        text, title = tokens[0]
+        return add_link(roam_markup.transform_string(text), f"roam-page://{title}")
+
+    return pp.Regex(md_link_to_page_re, as_group_list=True).set_parse_action(to_md)
+
+
 def page_link_in_md_link():
+    # Fallback for link texts with unbalanced brackets. They aren't valid Markdown links,
+    # so they aren't collected.
     def to_md(tokens):
         title = tokens[0]
         return f"](roam-page://{title})"
@@ -98,7 +141,7 @@ def page_link_in_md_link():
 def embedded_mentioned_page():
     def to_md(tokens):
         title = tokens[0]
-        return f"[{title}](roam-page://{title})"
+        return add_link(title, f"roam-page://{title}")
 
     return (
         pp.QuotedString("{{[[embed]]: [[", end_quote_char="]]}}")
@@ -107,13 +150,17 @@ def embedded_mentioned_page():
 
 
 roam_markup <<= (
-    tag()
+    # All markup below starts with one of these characters.
+    jimmy.md_lib.common.plain_text("#^_{([]")
+    | tag()
     | highlight()
     | italic()
     | embedded_block()
+    | md_link_to_block()
     | block_link_in_md_link()
     | block_link()
     | embedded_mentioned_page()
+    | md_link_to_page()
     | page_link_in_md_link()
     | any_link()
     | roam_internal_function()
@@ -121,9 +168,10 @@ roam_markup <<= (
 )
 
 
-def roam_to_md(roam_text: str) -> str:
+def roam_to_md(roam_text: str, links: list[jimmy.md_lib.links.MarkdownLink] | None = None) -> str:
     r"""
     Main Roam Research to Markdown conversion function.
+    The links to pages and blocks are appended to "links" if given.
 
     >>> roam_to_md("^^highlighted^^")
     '==highlighted=='
@@ -157,8 +205,26 @@ def roam_to_md(roam_text: str) -> str:
     '((aaa))'
     >>> roam_to_md("{{[[pdf]]: https://some.url/abc.pdf}}")
     '<https://some.url/abc.pdf>'
+    >>> roam_to_md("[a ^^b^^]([[c]]) [d](((JF3iFJPKu))) [e](((f))) [[g]]", links := [])
+    '[a ==b==](roam-page://c) [d](roam-block://JF3iFJPKu) [e](((f))) [g](roam-page://g)'
+    >>> links  # doctest: +NORMALIZE_WHITESPACE
+    [MarkdownLink(text='a ==b==', url='roam-page://c', title=''),
+     MarkdownLink(text='d', url='roam-block://JF3iFJPKu', title=''),
+     MarkdownLink(text='g', url='roam-page://g', title='')]
+    >>> roam_to_md("[a [b] c]([[Page]]) [d [[e]]](((JF3iFJPKu)))", links := [])
+    '[a [b] c](roam-page://Page) [d [e](roam-page://e)](roam-block://JF3iFJPKu)'
+    >>> links  # doctest: +NORMALIZE_WHITESPACE
+    [MarkdownLink(text='a [b] c', url='roam-page://Page', title=''),
+     MarkdownLink(text='e', url='roam-page://e', title=''),
+     MarkdownLink(text='d [e](roam-page://e)', url='roam-block://JF3iFJPKu', title='')]
+    >>> roam_to_md("[a ] b]([[Page]])", links := []), links
+    ('[a ] b](roam-page://Page)', [])
     """
     roam_text = roam_text.replace("{{[[TODO]]}}", "[ ]")
     roam_text = roam_text.replace("{{[[DONE]]}}", "[x]")
     roam_text = roam_text.replace("[[>]]", ">")
-    return roam_markup.transform_string(roam_text)
+    token = LINKS.set([] if links is None else links)
+    try:
+        return roam_markup.transform_string(roam_text)
+    finally:
+        LINKS.reset(token)
@@ -24,6 +24,7 @@ pp.ParserElement.set_default_whitespace_chars("")
 # speedup: https://github.com/pyparsing/pyparsing/wiki/Performance-Tips
 # - pp.ParserElement.enable_packrat() -> seems to be even slower
 # - use regex instead of chaining
+# - consume plain text at once, see "plain_text()"
 multiline_quote_re = re.compile(r"<<<\n([\S\s]*?)\n<<<(.*)")
 link_re = re.compile(r"\[(ext|img.*?)?\[(.*?)\]\]")
 list_re = re.compile(r"^([*#>]+) ", re.MULTILINE)
@@ -175,9 +176,11 @@ def table():
 
 
 wikitext_markup <<= (
+    # All markup below starts with one of these characters.
+    jimmy.md_lib.common.plain_text("'_^,@/-![*#><|")
     # basic formatting:
     # https://tiddlywiki.com/static/Formatting%2520in%2520WikiText.html
-    quote("''", "**")  # bold
+    | quote("''", "**")  # bold
     | quote("__", "++")  # underline
     | quote("^^", "^")  # superscript
     | quote(",,", "~")  # subscript
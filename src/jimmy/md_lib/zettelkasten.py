@@ -4,6 +4,7 @@ import re
 
 import pyparsing as pp
 
+import jimmy.md_lib.common
 import jimmy.md_lib.links
 import jimmy.md_lib.tables
 
@@ -47,9 +48,11 @@ def colored():
 
 
 def code_block():
+    # only transform newlines in code blocks
+    code_markup = newline()
+
     def to_md(tokens):
-        # only transform newlines in code blocks
-        return f"\n```\n{newline().transform_string(tokens[0])}\n```"
+        return f"\n```\n{code_markup.transform_string(tokens[0])}\n```"
 
     return pp.QuotedString("[code]", end_quote_char="[/code]", multiline=True).set_parse_action(
         to_md
@@ -111,8 +114,10 @@ def table():
 
 
 bbcode_markup <<= (
+    # All markup below starts with "[".
+    jimmy.md_lib.common.plain_text("[")
     # more specific markup first
-    list_()
+    | list_()
     | code_block()
     | table()
     #
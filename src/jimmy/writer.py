@@ -85,7 +85,7 @@ class PathDeterminer:
             if resource.title is not None and (suffix := Path(resource.title).suffix) != "":
                 resource.path = resource.path.with_suffix(suffix)
             else:
-                guessed_suffix = common.guess_suffix(resource.filename)
+                guessed_suffix = common.guess_suffix(resource.filename, resource.content)
                 resource.path = resource.path.with_suffix(guessed_suffix)
 
     def determine_paths(self, notebook: imf.Notebook):
@@ -193,7 +193,22 @@ class FilesystemWriter:
 
         note.body += "\n".join(unlinked_resources)
 
+    def write_resource_content(self, resource: imf.Resource):
+        """Write a resource, which isn't available as file, directly to its final path."""
+        assert resource.content is not None
+        if resource.path is None:
+            LOGGER.warning(f'Could not determine path for resource "{resource.filename.name}".')
+            return
+
+        resource.path = common.get_unique_path(resource.path, resource.content)
+        resource.path.parent.mkdir(exist_ok=True, parents=True)
+        with resource.content.open() as source, resource.path.open("wb") as target:
+            shutil.copyfileobj(source, target, length=1024**2)
+
     def write_resource(self, resource: imf.Resource):
+        if resource.content is not None:
+            self.write_resource_content(resource)
+            return
         # Resolve the source file path to avoid accessing deleted folders, like
         # "deleted_folder/../image.png".
         source_file = resource.filename.resolve()
@@ -209,7 +224,12 @@ class FilesystemWriter:
         resource.path.parent.mkdir(exist_ok=True, parents=True)
         # Copy only the file content to avoid permission issues, like
         # https://github.com/marph91/jimmy/issues/59#issuecomment-3481986717
-        shutil.copyfile(source_file, resource.path)
+        if isinstance(source_file, common.ArchivePath):
+            # Stream the file from the archive directly to its destination.
+            with source_file.open("rb") as source, resource.path.open("wb") as target:
+                shutil.copyfileobj(source, target, length=1024**2)
+        else:
+            shutil.copyfile(source_file, resource.path)
 
     def update_note_links(self, note: imf.Note, note_link: imf.NoteLink):
         """Replace the original ID of notes with their path in the filesystem."""
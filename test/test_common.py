@@ -0,0 +1,390 @@
+import hashlib
+import io
+import json
+import logging
+from pathlib import Path
+import random
+import stat
+import tarfile
+import tempfile
+import time
+import unittest
+import xml.etree.ElementTree as ET  # noqa: N817
+import zipfile
+
+from parameterized import parameterized
+
+from jimmy import common
+
+# Chunk sizes that split the tokens at all positions and one that doesn't split at all.
+CHUNK_SIZES = [(1,), (2,), (3,), (7,), (1024,)]
+DOCUMENT = {
+    "number": -12345.678e-3,
+    "string": 'with [brackets], {braces}, "quotes", \\ and unicode: äö 🙂',
+    "nested": [[], {}, [1, [2, [3]]], {"a": {"b": None}}],
+    "literals": [True, False, None],
+    "last": "value",
+}
+
+
+def log_and_double(value: int) -> int:
+    common.LOGGER.debug(f"worker {value}")
+    return 2 * value
+
+
+@common.catch_all_exceptions
+def fail(value: int) -> int:
+    raise ValueError(f"invalid value {value}")
+
+
+def write_scratch_file(size: int) -> Path:
+    file_ = common.SCRATCH_SPACE.new_folder() / "file.bin"
+    file_.write_bytes(b"x" * size)
+    common.SCRATCH_SPACE.add(file_)
+    return file_
+
+
+class MapParallel(unittest.TestCase):
+    def test_order(self):
+        for jobs in (1, 3):
+            for processes in (False, True):
+                with self.subTest(jobs=jobs, processes=processes):
+                    results = common.map_parallel(
+                        log_and_double, range(10), jobs=jobs, processes=processes
+                    )
+                    self.assertEqual(list(results), list(range(0, 20, 2)))
+
+    def test_logs_of_worker_processes(self):
+        with self.assertLogs("jimmy", level="DEBUG") as logs:
+            list(common.map_parallel(log_and_double, [1, 2], jobs=2, processes=True))
+        self.assertCountEqual(logs.output, ["DEBUG:jimmy:worker 1", "DEBUG:jimmy:worker 2"])
+
+    def test_caught_exception_in_worker_process(self):
+        with self.assertLogs("jimmy", level="DEBUG") as logs:
+            results = list(common.map_parallel(fail, [1], jobs=2, processes=True))
+        self.assertEqual(results, [None])
+        self.assertIn("invalid value 1", "\n".join(logs.output))
+
+
+class Distribute(unittest.TestCase):
+    def test_all_items_distributed(self):
+        items = list(range(1000))
+        parts = common.distribute(items, [item % 7 for item in items], 4)
+        self.assertEqual(len(parts), 4)
+        self.assertCountEqual([item for part in parts for item in part], items)
+
+    def test_balanced(self):
+        random.seed(42)
+        weights = [random.randint(1, 1000) for _ in range(10_000)]
+        parts = common.distribute(list(range(len(weights))), weights, 8)
+        totals = [sum(weights[item] for item in part) for part in parts]
+        # Greedy distribution: The difference is at most the largest weight.
+        self.assertLessEqual(max(totals) - min(totals), max(weights))
+
+    def test_more_parts_than_items(self):
+        self.assertEqual(common.distribute(["a", "b"], [1, 1], 5), [["a"], ["b"]])
+
+    def test_no_parts(self):
+        self.assertEqual(common.distribute(["a", "b"], [1, 2], 0), [["b", "a"]])
+
+    def test_different_lengths(self):
+        with self.assertRaises(ValueError):
+            common.distribute(["a", "b"], [1], 2)
+
+
+class ExtractZip(unittest.TestCase):
+    def setUp(self):
+        temp_folder = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_folder.cleanup)
+        self.temp_folder = Path(temp_folder.name)
+        self.zip_file = self.temp_folder / "archive.zip"
+        with zipfile.ZipFile(self.zip_file, "w") as zip_ref:
+            for index in range(20):
+                zip_ref.writestr(f"folder/file_{index}.txt", "content" * index)
+            zip_ref.writestr("other/file.txt", "other")
+
+    def test_jobs(self):
+        for jobs in (1, 3):
+            with self.subTest(jobs=jobs):
+                target = self.temp_folder / f"jobs_{jobs}"
+                common.extract_zip(self.zip_file, temp_folder=target, jobs=jobs)
+                files = sorted(p.relative_to(target) for p in target.rglob("*") if p.is_file())
+                self.assertEqual(len(files), 21)
+                self.assertEqual((target / "folder/file_3.txt").read_text(), "content" * 3)
+
+    def test_include(self):
+        for jobs in (1, 3):
+            with self.subTest(jobs=jobs):
+                target = self.temp_folder / f"include_{jobs}"
+                common.extract_zip(self.zip_file, temp_folder=target, include="other/*", jobs=jobs)
+                self.assertEqual([p.name for p in target.rglob("*.txt")], ["file.txt"])
+
+
+class ArchivePath(unittest.TestCase):
+    def setUp(self):
+        temp_folder = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_folder.cleanup)
+        self.zip_file = Path(temp_folder.name) / "archive.zip"
+        with zipfile.ZipFile(self.zip_file, "w") as zip_ref:
+            zip_ref.writestr(zipfile.ZipInfo("folder/note.md", (2024, 1, 2, 3, 4, 6)), "content")
+            zip_ref.writestr("image.png", b"png")
+        self.root = common.ArchivePath(self.zip_file)
+        self.addCleanup(common.close_archives)
+
+    def test_root(self):
+        self.assertTrue(self.root.exists())
+        self.assertTrue(self.root.is_dir())
+        self.assertFalse(self.root.is_file())
+        self.assertTrue(stat.S_ISDIR(self.root.stat().st_mode))
+        self.assertEqual(sorted(p.name for p in self.root.iterdir()), ["folder", "image.png"])
+
+    def test_member(self):
+        note = self.root / "folder" / "note.md"
+        self.assertIsInstance(note, common.ArchivePath)
+        self.assertTrue(note.exists())
+        self.assertTrue(note.is_file())
+        self.assertEqual(note.read_text(encoding="utf-8"), "content")
+        self.assertEqual((self.root / "image.png").read_bytes(), b"png")
+        self.assertEqual([p.name for p in self.root.rglob("*.md")], ["note.md"])
+
+    def test_stat(self):
+        note_stat = (self.root / "folder" / "note.md").stat()
+        self.assertTrue(stat.S_ISREG(note_stat.st_mode))
+        self.assertEqual(note_stat.st_size, len("content"))
+        self.assertEqual(time.localtime(note_stat.st_mtime)[:6], (2024, 1, 2, 3, 4, 6))
+        # The folder is only implicitly contained.
+        self.assertTrue(stat.S_ISDIR((self.root / "folder").stat().st_mode))
+
+    def test_missing_member(self):
+        missing = self.root / "missing.md"
+        self.assertFalse(missing.exists())
+        self.assertFalse(missing.is_file())
+        with self.assertRaises(FileNotFoundError):
+            missing.stat()
+
+    def test_outside_of_archive(self):
+        outside = self.root.parent / "outside.txt"
+        outside.write_text("outside", encoding="utf-8")
+        self.assertIsNone(outside.member)
+        self.assertEqual(outside.read_text(encoding="utf-8"), "outside")
+        self.assertEqual(outside.stat().st_size, len("outside"))
+
+    def test_close_archives(self):
+        common.close_archives()
+        self.assertIsNone(self.root.archive.root.fp)
+        self.assertEqual(common.OPEN_ARCHIVES, [])
+
+
+class ScratchSpace(unittest.TestCase):
+    def setUp(self):
+        temp_folder = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_folder.cleanup)
+        self.parent_folder = Path(temp_folder.name)
+        common.SCRATCH_SPACE.configure(self.parent_folder, max_size=100)
+        self.addCleanup(common.SCRATCH_SPACE.configure)
+
+    def test_reserve(self):
+        common.SCRATCH_SPACE.reserve(60)
+        common.SCRATCH_SPACE.reserve(40)
+        with self.assertRaises(common.ScratchSpaceExceededError):
+            common.SCRATCH_SPACE.reserve(1)
+        # The failed reservation isn't accounted.
+        self.assertEqual(common.SCRATCH_SPACE.used_size.value, 100)
+
+    def test_add(self):
+        folder = common.SCRATCH_SPACE.new_folder()
+        self.assertEqual(folder.parent.parent, self.parent_folder)
+        (folder / "sub").mkdir()
+        (folder / "a.bin").write_bytes(b"x" * 10)
+        (folder / "sub" / "b.bin").write_bytes(b"x" * 20)
+        common.SCRATCH_SPACE.add(folder)
+        common.SCRATCH_SPACE.add(folder / "a.bin")
+        common.SCRATCH_SPACE.add(folder / "missing.bin")
+        self.assertEqual(common.SCRATCH_SPACE.used_size.value, 40)
+
+    def test_cleanup(self):
+        folder = common.SCRATCH_SPACE.new_folder()
+        common.SCRATCH_SPACE.reserve(50)
+        common.SCRATCH_SPACE.cleanup()
+        self.assertFalse(folder.exists())
+        self.assertEqual(common.SCRATCH_SPACE.used_size.value, 0)
+
+    def test_worker_processes(self):
+        files = list(common.map_parallel(write_scratch_file, [10, 20, 30], jobs=2, processes=True))
+        self.assertTrue(all(file_.is_relative_to(common.SCRATCH_SPACE.folder) for file_ in files))
+        self.assertEqual(common.SCRATCH_SPACE.used_size.value, 60)
+        # The budget is shared with the main process.
+        with self.assertRaises(common.ScratchSpaceExceededError):
+            list(common.map_parallel(write_scratch_file, [50], jobs=2, processes=True))
+        self.assertEqual(common.SCRATCH_SPACE.used_size.value, 60)
+
+
+class SpooledContent(unittest.TestCase):
+    def setUp(self):
+        temp_folder = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_folder.cleanup)
+        common.SCRATCH_SPACE.configure(Path(temp_folder.name))
+        self.addCleanup(common.SCRATCH_SPACE.configure)
+
+    def test_small_content(self):
+        content = common.SpooledContent(b"small")
+        self.assertEqual(common.SCRATCH_SPACE.used_size.value, 0)
+        with content.open() as stream:
+            self.assertEqual(stream.read(), b"small")
+
+    def test_large_content(self):
+        data = b"%PDF-1.7" + random.randbytes(common.SpooledContent.max_memory_size)
+        content = common.SpooledContent(data)
+        del data
+        self.assertEqual(common.SCRATCH_SPACE.used_size.value, content.size)
+        self.assertEqual(common.guess_suffix(Path("file"), content), ".pdf")
+        for _ in range(2):
+            with content.open() as stream:
+                self.assertEqual(hashlib.md5(stream.read()).hexdigest(), content.md5)
+
+
+class TarMemberContent(unittest.TestCase):
+    def test_read_in_place(self):
+        temp_folder = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_folder.cleanup)
+        tar_path = Path(temp_folder.name) / "archive.tar"
+        with tarfile.open(tar_path, "w") as tar_ref:
+            for name, data in (("image.png", b"png"), ("document.pdf", b"pdf")):
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar_ref.addfile(info, io.BytesIO(data))
+
+        tar_file = common.open_tar(tar_path)
+        self.addCleanup(common.close_archives)
+        content = common.TarMemberContent(tar_file, tar_file.getmember("document.pdf"))
+        self.assertEqual((content.size, content.md5), (3, hashlib.md5(b"pdf").hexdigest()))
+        for _ in range(2):
+            with content.open() as stream:
+                self.assertEqual(stream.read(), b"pdf")
+        common.close_archives()
+        self.assertTrue(tar_file.closed)
+
+
+class JsonReader(unittest.TestCase):
+    @parameterized.expand(CHUNK_SIZES)
+    def test_read_value(self, chunk_size: int):
+        document = json.dumps(DOCUMENT, ensure_ascii=False)
+        reader = common.JsonReader(io.StringIO(document), chunk_size)
+        self.assertEqual(reader.read_value(), DOCUMENT)
+
+    @parameterized.expand(CHUNK_SIZES)
+    def test_iter_array(self, chunk_size: int):
+        array = [DOCUMENT, 1, 12345678901234567890, "[", [], 2.5e10]
+        reader = common.JsonReader(io.StringIO(json.dumps(array, indent=2)), chunk_size)
+        self.assertEqual(list(reader.iter_array()), array)
+
+    @parameterized.expand(CHUNK_SIZES)
+    def test_skip_values(self, chunk_size: int):
+        document = json.dumps(DOCUMENT, ensure_ascii=False, indent=1)
+        reader = common.JsonReader(io.StringIO(document), chunk_size)
+        keys = []
+        for key in reader.iter_object():
+            keys.append(key)
+            if key == "last":
+                self.assertEqual(reader.read_value(), "value")
+        self.assertEqual(keys, list(DOCUMENT))
+
+    @parameterized.expand(CHUNK_SIZES)
+    def test_skip_elements(self, chunk_size: int):
+        reader = common.JsonReader(io.StringIO('[{"a": "]"}, [1, "\\"]"], 2]'), chunk_size)
+        elements = []
+        for index, _ in enumerate(reader.iter_array(decode=False)):
+            if index == 2:
+                elements.append(reader.read_value())
+        self.assertEqual(elements, [2])
+
+    @parameterized.expand(CHUNK_SIZES)
+    def test_nested_iteration(self, chunk_size: int):
+        document = '{"chats": {"list": [{"name": "a", "messages": [1, 2]}, {"messages": []}]}}'
+        reader = common.JsonReader(io.StringIO(document), chunk_size)
+        messages = []
+        for key in reader.iter_object():
+            self.assertEqual(key, "chats")
+            for chat_key in reader.iter_object():
+                self.assertEqual(chat_key, "list")
+                for _ in reader.iter_array(decode=False):
+                    for chat_key in reader.iter_object():
+                        if chat_key == "messages":
+                            messages.append(list(reader.iter_array()))
+        self.assertEqual(messages, [[1, 2], []])
+
+    @parameterized.expand(
+        [
+            ("truncated_array", "[1, 2"),
+            ("truncated_number", "[1, 1.5e"),
+            ("truncated_string", '["abc'),
+            ("trailing_comma", "[1,]"),
+            ("missing_colon", '{"a" 1}'),
+            ("object_instead_of_array", '{"a": 1}'),
+            ("empty", ""),
+        ]
+    )
+    def test_malformed(self, _, document: str):
+        for chunk_size in (1, 1024):
+            with self.subTest(chunk_size=chunk_size):
+                reader = common.JsonReader(io.StringIO(document), chunk_size)
+                with self.assertRaises(json.JSONDecodeError):
+                    list(reader.iter_array())
+
+    @parameterized.expand(
+        [("unterminated_container", '{"a": [1, {"b": 2}'), ("string", '{"a": "b')]
+    )
+    def test_malformed_skipped_value(self, _, document: str):
+        reader = common.JsonReader(io.StringIO(document), 2)
+        with self.assertRaises(json.JSONDecodeError):
+            for _ in reader.iter_object():
+                pass
+
+    def test_iter_json_array(self):
+        with tempfile.TemporaryDirectory() as temp_folder:
+            file_ = Path(temp_folder) / "array.json"
+            file_.write_text(json.dumps([DOCUMENT, DOCUMENT]), encoding="utf-8")
+            self.assertEqual(list(common.iter_json_array(file_)), [DOCUMENT, DOCUMENT])
+
+
+class IterXmlElements(unittest.TestCase):
+    XML = (
+        b'<rss xmlns:wp="http://wordpress.org/export/1.2/"><channel><title>Blog</title>'
+        b"<item><title>1</title><wp:id>1</wp:id></item><item><title>2</title></item>"
+        b"</channel></rss>"
+    )
+
+    def test_depth(self):
+        elements = [
+            (element.tag, parent.tag)
+            for element, parent in common.iter_xml_elements(io.BytesIO(self.XML), depth=2)
+        ]
+        self.assertEqual(elements, [("title", "channel"), ("item", "channel"), ("item", "channel")])
+
+    def test_namespaces(self):
+        namespaces: dict[str, str] = {}
+        items = common.iter_xml_elements(io.BytesIO(self.XML), depth=2, namespaces=namespaces)
+        element, _ = next(items)
+        self.assertEqual(element.tag, "title")
+        self.assertEqual(namespaces, {"wp": "http://wordpress.org/export/1.2/"})
+        element, _ = next(items)
+        self.assertEqual(element.findtext("wp:id", namespaces=namespaces), "1")
+
+    def test_processed_elements_are_removed(self):
+        channels = set()
+        for element, channel in common.iter_xml_elements(io.BytesIO(self.XML), depth=2):
+            # The parser may read ahead, but the processed elements are removed.
+            self.assertIs(channel[0], element)
+            channels.add(channel)
+        self.assertEqual([len(channel) for channel in channels], [0])
+
+    def test_malformed(self):
+        items = common.iter_xml_elements(io.BytesIO(b"<a><b>1</b><b>2</a>"), depth=1)
+        self.assertEqual(next(items)[0].text, "1")
+        with self.assertRaises(ET.ParseError):
+            list(items)
+
+
+if __name__ == "__main__":
+    logging.basicConfig()
+    unittest.main()
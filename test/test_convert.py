@@ -59,6 +59,10 @@ class EndToEnd(unittest.TestCase):
             local_image_folder=None,
             max_name_length=50,
             print_tree=False,
+            jobs=1,
+            max_pdf_pages=None,
+            scratch_dir=None,
+            max_scratch_size=None,
             exclude_notes=None,
             exclude_notes_with_tags=None,
             exclude_tags=None,